@@ -2,60 +2,193 @@
 """Local web app to browse Instagram following list."""
 
 import csv
-import json
+import gzip
+import hashlib
+import heapq
 import os
+import queue
 import sqlite3
-
-from flask import Flask, render_template, jsonify, send_from_directory, request
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from flask import Flask, Response, g, render_template, jsonify, send_file, request, abort
+from werkzeug.security import safe_join
+
+from igrestore import thumbnails
+from igrestore.avatar_store import AvatarStore, pack_path_for
+from igrestore.fsutil import mtimes_ns
+from igrestore.metrics import METRICS, growth, load_series, metrics_path_for, rank_changes
+from igrestore.store import load_profiles, pic_versions, profile_sources
+from search_index import SearchIndex
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 DATA_DIR = os.path.dirname(os.path.abspath(__file__))
 PROFILES_JSON = os.path.join(DATA_DIR, "profiles.json")
 FOLLOWING_CSV = os.path.join(DATA_DIR, "following.csv")
 PICS_DIR = os.path.join(DATA_DIR, "pics")
+THUMBS_DIR = thumbnails.thumbs_dir_for(PICS_DIR)
+AVATAR_PACK = pack_path_for(PICS_DIR)
 DB_PATH = os.path.join(DATA_DIR, "decisions.db")
+METRICS_DB = metrics_path_for(PROFILES_JSON)
 
 app = Flask(__name__)
 
 
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS decisions "
+    "(username TEXT PRIMARY KEY, decision TEXT NOT NULL DEFAULT 'undecided', notes TEXT DEFAULT '')",
+    "CREATE TABLE IF NOT EXISTS manual_adds "
+    "(username TEXT PRIMARY KEY, display_name TEXT DEFAULT '', notes TEXT DEFAULT '', "
+    "decision TEXT NOT NULL DEFAULT 'will_follow', added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)",
+    "CREATE TABLE IF NOT EXISTS people "
+    "(id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, notes TEXT DEFAULT '', "
+    "added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)",
+)
+
+# journal_mode is stored in the database file, so init_db sets it once
+PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+)
+
+# A NULL :decision or :notes leaves that column as it was
+UPSERT_DECISION = (
+    "INSERT INTO decisions (username, decision, notes) "
+    "VALUES (:username, COALESCE(:decision, 'undecided'), COALESCE(:notes, '')) "
+    "ON CONFLICT(username) DO UPDATE SET "
+    "decision=COALESCE(:decision, decision), notes=COALESCE(:notes, notes)"
+)
+
+POOL_SIZE = 8
+_pool = queue.LifoQueue(maxsize=POOL_SIZE)
+_migrated = set()
+_migrate_lock = threading.Lock()
+
+
+def init_db():
+    """Create the tables in DB_PATH and turn on WAL. Runs once per database per process."""
+    with _migrate_lock:
+        if DB_PATH in _migrated:
+            return
+        conn = sqlite3.connect(DB_PATH)
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+        conn.close()
+        _migrated.add(DB_PATH)
+
+
+def _checkout():
+    """A (path, connection) pair from the pool, or a new one if it is empty."""
+    while True:
+        try:
+            path, conn = _pool.get_nowait()
+        except queue.Empty:
+            break
+        if path == DB_PATH:
+            return path, conn
+        conn.close()
+    init_db()
+    # the development server runs each request on a new thread
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return DB_PATH, conn
+
+
+def _release(entry):
+    path, conn = entry
+    if conn.in_transaction:
+        conn.rollback()
+    try:
+        _pool.put_nowait(entry)
+    except queue.Full:
+        conn.close()
+
+
 def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute(
-        "CREATE TABLE IF NOT EXISTS decisions "
-        "(username TEXT PRIMARY KEY, decision TEXT NOT NULL DEFAULT 'undecided', notes TEXT DEFAULT '')"
-    )
-    conn.execute(
-        "CREATE TABLE IF NOT EXISTS manual_adds "
-        "(username TEXT PRIMARY KEY, display_name TEXT DEFAULT '', notes TEXT DEFAULT '', "
-        "decision TEXT NOT NULL DEFAULT 'will_follow', added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
-    )
-    conn.execute(
-        "CREATE TABLE IF NOT EXISTS people "
-        "(id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, notes TEXT DEFAULT '', "
-        "added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
-    )
-    conn.commit()
-    return conn
+    """This request's connection to DB_PATH, from a bounded pool.
+
+    Pooled connections stay open, so sqlite3's statement cache keeps the
+    handlers' queries prepared. It goes back to the pool when the request
+    ends; don't close it.
+    """
+    if "db" not in g:
+        g.db = _checkout()
+    return g.db[1]
+
+
+@app.teardown_appcontext
+def _release_db(exc):
+    entry = g.pop("db", None)
+    if entry is not None:
+        _release(entry)
+
+
+@contextmanager
+def pooled_db():
+    """A pooled connection for use outside a request."""
+    entry = _checkout()
+    try:
+        yield entry[1]
+    finally:
+        _release(entry)
 
 
 def get_all_decisions():
-    conn = get_db()
-    rows = conn.execute("SELECT username, decision, notes FROM decisions").fetchall()
-    conn.close()
+    with pooled_db() as conn:
+        rows = conn.execute("SELECT username, decision, notes FROM decisions").fetchall()
     return {r[0]: {"decision": r[1], "notes": r[2] or ""} for r in rows}
 
 
-def load_data():
+# Process-wide profile index. Rows are built once from following.csv,
+# profiles.json (plus its fetch journal) and a single listing of pics/ or the
+# avatar pack's index, and rebuilt only when one of
+# those sources changes on disk. Decisions live in a write-through cache that
+# /api/decision updates alongside SQLite, so serving a page never re-reads them.
+_index_lock = threading.Lock()
+_index = {"mtimes": None, "rows": [], "by_username": {}, "version": 0}
+_decisions = None
+_avatars = None
+
+
+def _avatar_store():
+    global _avatars
+    if _avatars is None or _avatars.path != AVATAR_PACK:
+        _avatars = AvatarStore(AVATAR_PACK)
+    return _avatars
+
+
+def _cached_decisions():
+    global _decisions
+    if _decisions is None:
+        _decisions = get_all_decisions()
+    return _decisions
+
+
+# the profile fields _build_rows copies into each row
+PROFILE_COLUMNS = ("status", "full_name", "followers", "following", "posts", "is_private", "is_verified", "biography")
+
+
+def _build_rows():
     csv_data = {}
     with open(FOLLOWING_CSV, "r") as f:
         for row in csv.DictReader(f):
             csv_data[row["username"]] = row
 
-    profiles = {}
-    if os.path.exists(PROFILES_JSON):
-        with open(PROFILES_JSON, "r") as f:
-            profiles = json.load(f)
+    profiles = load_profiles(PROFILES_JSON, PROFILE_COLUMNS)
+    versions = pic_versions(PICS_DIR, _avatar_store())
 
-    decisions = get_all_decisions()
+    decisions = _cached_decisions()
 
     result = []
     for username, csv_row in csv_data.items():
@@ -70,7 +203,8 @@ def load_data():
             "is_private": False,
             "is_verified": False,
             "biography": "",
-            "has_pic": os.path.exists(os.path.join(PICS_DIR, f"{username}.jpg")),
+            "has_pic": username in versions,
+            "pic_version": versions.get(username),
             "decision": decisions.get(username, {}).get("decision", "undecided"),
             "notes": decisions.get(username, {}).get("notes", ""),
         }
@@ -90,47 +224,508 @@ def load_data():
     return result
 
 
+def _parse_count(val):
+    """Mirror of parseCount() in the template: "1,234", "12.5k" and "3M" to numbers."""
+    if val is None:
+        return None
+    if isinstance(val, (int, float)):
+        return val
+    s = str(val).replace(",", "").strip()
+    try:
+        if s[-1:] in ("k", "K"):
+            return float(s[:-1]) * 1000
+        if s[-1:] in ("m", "M"):
+            return float(s[:-1]) * 1000000
+        return int(s) or None
+    except ValueError:
+        return None
+
+
+def _build_orders(rows):
+    """Precompute every supported sort as a list of row positions, and each
+    position's rank in it. Returns (orders, ranks), keyed by sort.
+
+    Accounts with a downloaded pic always come first, as in the UI.
+    """
+    def pics_first(key):
+        return sorted(range(len(rows)), key=lambda i: (not rows[i]["has_pic"], key(rows[i])))
+
+    def followers(default):
+        def key(r):
+            n = _parse_count(r["followers"])
+            return default if n is None else n
+        return key
+
+    desc = followers(-1)
+    orders = {
+        "username": pics_first(lambda r: r["username"].casefold()),
+        "name": pics_first(lambda r: (r["display_name"] or "").casefold()),
+        "followers-desc": pics_first(lambda r: -desc(r)),
+        "followers-asc": pics_first(followers(float("inf"))),
+    }
+    ranks = {}
+    for sort, order in orders.items():
+        rank = ranks[sort] = [0] * len(order)
+        for r, pos in enumerate(order):
+            rank[pos] = r
+    return orders, ranks
+
+
+def _group_positions(rows, field):
+    groups = {}
+    for i, r in enumerate(rows):
+        groups.setdefault(r[field], set()).add(i)
+    return groups
+
+
+def load_data():
+    """Return the merged profile rows, rebuilding only if a source file changed."""
+    mtimes = mtimes_ns(FOLLOWING_CSV, *profile_sources(PROFILES_JSON), PICS_DIR, AVATAR_PACK)
+    with _index_lock:
+        if _index["mtimes"] != mtimes:
+            rows = _build_rows()
+            _index["rows"] = rows
+            _index["by_username"] = {r["username"]: i for i, r in enumerate(rows)}
+            _index["orders"], _index["ranks"] = _build_orders(rows)
+            _index["by_status"] = _group_positions(rows, "status")
+            _index["by_decision"] = _group_positions(rows, "decision")
+            _index["search"] = SearchIndex(rows)
+            _index["mtimes"] = mtimes
+            _index["version"] += 1
+        return _index["rows"]
+
+
+def data_version():
+    """A number that changes whenever the index rows or decisions do."""
+    load_data()
+    return _index["version"]
+
+
+def record_decisions(updates):
+    """Apply saved updates to the decision cache and the index rows in place.
+
+    Each update is {"username", "decision", "notes"}; None keeps the old value.
+    """
+    with _index_lock:
+        decisions = _cached_decisions()
+        for u in updates:
+            username = u["username"]
+            old = decisions.get(username, {"decision": "undecided", "notes": ""})
+            new = {
+                "decision": u["decision"] if u["decision"] is not None else old["decision"],
+                "notes": u["notes"] if u["notes"] is not None else old["notes"],
+            }
+            decisions[username] = new
+            pos = _index["by_username"].get(username)
+            if pos is None:
+                continue
+            # by_username is empty until the first load_data(), so this exists here
+            by_decision = _index["by_decision"]
+            row = _index["rows"][pos]
+            by_decision.get(row["decision"], set()).discard(pos)
+            by_decision.setdefault(new["decision"], set()).add(pos)
+            row.update(new)
+            _index["search"].update(pos, row)
+        _index["version"] += 1
+
+
+def save_decisions(updates):
+    """Upsert a batch of decision updates in one transaction, then update the caches."""
+    updates = [
+        {"username": u["username"], "decision": u.get("decision"), "notes": u.get("notes")}
+        for u in updates
+    ]
+    conn = get_db()
+    with conn:
+        conn.executemany(UPSERT_DECISION, updates)
+    record_decisions(updates)
+    return len(updates)
+
+
+STATUS_GROUPS = {"error": ("error", "http_error")}
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def _candidates(q, status, decision):
+    """Positions matching the filters, or None for "everything". Hold _index_lock."""
+    candidates = None
+    if status != "all":
+        candidates = set()
+        for s in STATUS_GROUPS.get(status, (status,)):
+            candidates |= _index["by_status"].get(s, set())
+    if decision != "all":
+        matched = _index["by_decision"].get(decision, set())
+        candidates = matched.copy() if candidates is None else candidates & matched
+    if q:
+        matched = _index["search"].matches(q)
+        candidates = matched if candidates is None else candidates & matched
+    return candidates
+
+
+def matching_usernames(q="", status="all", decision="all"):
+    load_data()
+    with _index_lock:
+        rows = _index["rows"]
+        candidates = _candidates(q, status, decision)
+        if candidates is None:
+            return [r["username"] for r in rows]
+        return [rows[i]["username"] for i in sorted(candidates)]
+
+
+def query_profiles(q="", status="all", decision="all", sort="username", cursor=0, limit=DEFAULT_PAGE_SIZE):
+    """Filter, sort and paginate the profile index.
+
+    `cursor` is a position in the precomputed sort order, so pages stay stable
+    while decisions on earlier rows change. Returns (items, total, next_cursor).
+    """
+    load_data()
+    with _index_lock:
+        rows = _index["rows"]
+        if sort not in _index["orders"]:
+            sort = "username"
+        order = _index["orders"][sort]
+
+        candidates = _candidates(q, status, decision)
+
+        if candidates is None:
+            total = len(order)
+            page = order[cursor:cursor + limit]
+            end = cursor + len(page)
+        elif not candidates:
+            return [], 0, None
+        elif len(candidates) ** 2 < limit * (len(order) - cursor):
+            # few candidates: sorting them by rank beats walking the order to find them
+            total = len(candidates)
+            rank = _index["ranks"][sort]
+            ranked = heapq.nsmallest(limit, (rank[i] for i in candidates if rank[i] >= cursor))
+            page = [order[r] for r in ranked]
+            end = ranked[-1] + 1 if len(ranked) == limit else len(order)
+        else:
+            total = len(candidates)
+            page = []
+            end = cursor
+            while end < len(order) and len(page) < limit:
+                if order[end] in candidates:
+                    page.append(order[end])
+                end += 1
+
+        next_cursor = end if end < len(order) and page else None
+        return [rows[i] for i in page], total, next_cursor
+
+
+def decision_counts():
+    load_data()
+    with _index_lock:
+        counts = {d: len(positions) for d, positions in _index["by_decision"].items()}
+        counts["all"] = len(_index["rows"])
+    return counts
+
+
+# JSON GET responses carry a strong ETag hashed from the version of the data
+# they were built from, the request path and the content encoding, so an
+# unchanged reload or poll gets a 304. Encoded bodies are cached under the
+# same key, so a repeat from another client skips the query and compression.
+# The version counters restart at 0 with the process, so every ETag also
+# mixes in a per-process nonce; an ETag from before a restart never matches.
+JSON_CACHE_SIZE = 128
+MIN_COMPRESS_SIZE = 1024
+PROCESS_NONCE = os.urandom(8).hex()
+_json_lock = threading.Lock()
+_json_bodies = OrderedDict()
+_people_version = 0
+
+
+def _pick_encoding():
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def _compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def _json_response(version, build):
+    """Respond with build()'s payload as JSON, or 304 if the client has it."""
+    encoding = _pick_encoding()
+    etag = hashlib.sha1(f"{PROCESS_NONCE}\0{version}\0{request.full_path}\0{encoding}".encode()).hexdigest()
+    if etag in request.if_none_match:
+        resp = Response(status=304)
+    else:
+        with _json_lock:
+            cached = _json_bodies.get(etag)
+            if cached is not None:
+                _json_bodies.move_to_end(etag)
+        if cached is None:
+            body = app.json.dumps(build()).encode()
+            if encoding is None or len(body) < MIN_COMPRESS_SIZE:
+                cached = (body, None)
+            else:
+                cached = (_compress(body, encoding), encoding)
+            with _json_lock:
+                _json_bodies[etag] = cached
+                while len(_json_bodies) > JSON_CACHE_SIZE:
+                    _json_bodies.popitem(last=False)
+        body, content_encoding = cached
+        resp = Response(body, mimetype="application/json")
+        if content_encoding:
+            resp.headers["Content-Encoding"] = content_encoding
+    resp.set_etag(etag)
+    resp.vary.add("Accept-Encoding")
+    resp.cache_control.no_cache = True
+    return resp
+
+
+def _people_changed():
+    global _people_version
+    with _json_lock:
+        _people_version += 1
+
+
 @app.route("/")
 def index():
     data = load_data()
-    return render_template("index.html", profiles=data, total=len(data))
+    return render_template("index.html", total=len(data))
 
 
 @app.route("/api/profiles")
 def api_profiles():
-    return jsonify(load_data())
+    args = request.args
+    try:
+        cursor = max(int(args.get("cursor") or 0), 0)
+        limit = min(max(int(args.get("limit") or DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "cursor and limit must be integers"}), 400
+
+    def build():
+        items, total, next_cursor = query_profiles(
+            q=args.get("q", "").strip(),
+            status=args.get("status", "all"),
+            decision=args.get("decision", "all"),
+            sort=args.get("sort", "username"),
+            cursor=cursor,
+            limit=limit,
+        )
+        return {
+            "items": items,
+            "total": total,
+            "counts": decision_counts(),
+            "next_cursor": next_cursor,
+        }
+
+    return _json_response(data_version(), build)
+
+
+@app.route("/api/search")
+def api_search():
+    q = request.args.get("q", "").strip()
+    try:
+        limit = min(max(int(request.args.get("limit") or 20), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    def build():
+        with _index_lock:
+            rows = _index["rows"]
+            hits = _index["search"].search(q, limit)
+            items = [dict(rows[pos], match=kind) for pos, kind in hits]
+        return {"query": q, "items": items}
+
+    return _json_response(data_version(), build)
+
+
+# Follower/following/post history, decoded once per change to METRICS_DB
+_metrics_lock = threading.Lock()
+_metrics = {"key": None, "series": {}}
+
+
+def _metrics_key():
+    try:
+        st = os.stat(METRICS_DB)
+        return (METRICS_DB, st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        return (METRICS_DB, None, None)
+
+
+def load_metrics():
+    key = _metrics_key()
+    with _metrics_lock:
+        if _metrics["key"] != key:
+            _metrics["series"] = load_series(METRICS_DB)
+            _metrics["key"] = key
+        return _metrics["series"]
+
+
+def _window_start():
+    """Epoch seconds ?days= ago, or None without it. ValueError if it isn't a number."""
+    days = request.args.get("days")
+    return time.time() - float(days) * 86400 if days else None
+
+
+@app.route("/api/growth")
+def api_growth():
+    args = request.args
+    metric = args.get("metric", "followers")
+    if metric not in METRICS:
+        return jsonify({"error": f"metric must be one of {', '.join(METRICS)}"}), 400
+    try:
+        since = _window_start()
+        limit = min(max(int(args.get("limit") or 50), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "days and limit must be numbers"}), 400
+
+    def build():
+        items = rank_changes(
+            load_metrics(), metric, since, limit,
+            relative=args.get("relative") == "1",
+            descending=args.get("order", "desc") != "asc",
+        )
+        return {"metric": metric, "since": since, "items": items}
+
+    # the window slides with the clock, so it is part of the version
+    return _json_response((_metrics_key(), since and int(since // 60)), build)
+
+
+@app.route("/api/growth/<username>")
+def api_growth_user(username):
+    try:
+        since = _window_start()
+    except ValueError:
+        return jsonify({"error": "days must be a number"}), 400
+    version = (_metrics_key(), since and int(since // 60))
+    result = growth(load_metrics(), username, since)
+    if result is None:
+        return jsonify({"error": f"no metrics for {username!r}"}), 404
+    return _json_response(version, lambda: result)
+
+
+# Image responses carry a strong ETag (SHA-1 of the bytes, cached per file
+# mtime and size). URLs with a ?v= version are immutable and cached for a
+# year; unversioned ones are revalidated and answered with 304 when unchanged.
+IMAGE_MAX_AGE = 365 * 24 * 3600
+_etags = {}
+
+
+def _content_etag(path):
+    st = os.stat(path)
+    key = (st.st_mtime_ns, st.st_size)
+    cached = _etags.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+    with open(path, "rb") as f:
+        etag = hashlib.sha1(f.read()).hexdigest()
+    _etags[path] = (key, etag)
+    return etag
+
+
+def _cache_headers(resp):
+    if request.args.get("v"):
+        resp.cache_control.max_age = IMAGE_MAX_AGE
+        resp.cache_control.public = True
+        resp.cache_control.immutable = True
+    else:
+        resp.cache_control.max_age = 0
+        resp.cache_control.no_cache = True
+    return resp
+
+
+def _send_image(path):
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    resp = send_file(path, etag=_content_etag(path), conditional=True)
+    resp.cache_control.no_cache = None
+    return _cache_headers(resp)
+
+
+def _send_original(username):
+    """A user's full picture, from the avatar pack if it has one, else pics/."""
+    packed = _avatar_store().get(username)
+    if packed is None:
+        return _send_image(safe_join(PICS_DIR, f"{username}.jpg"))
+    view, sha1, _ = packed
+    # WSGI servers want bytes, so this is the one copy out of the map
+    resp = Response(bytes(view), mimetype="image/jpeg")
+    resp.set_etag(sha1)
+    resp.make_conditional(request)
+    return _cache_headers(resp)
 
 
 @app.route("/pics/<filename>")
 def serve_pic(filename):
-    return send_from_directory(PICS_DIR, filename)
+    if not filename.endswith(".jpg"):
+        abort(404)
+    return _send_original(filename[:-4])
+
+
+@app.route("/thumbs/<int:size>/<username>")
+def serve_thumb(size, username):
+    """WebP or JPEG thumbnail, built on first request; falls back to the original."""
+    if size not in thumbnails.SIZES or "/" in username or username.startswith("."):
+        abort(404)
+    fmt = "webp" if "image/webp" in request.headers.get("Accept", "") else "jpg"
+    path = None
+    if thumbnails.available():
+        path = thumbnails.ensure_thumb(PICS_DIR, THUMBS_DIR, username, size, fmt, store=_avatar_store())
+    resp = _send_image(path) if path else _send_original(username)
+    resp.vary.add("Accept")
+    return resp
 
 
 @app.route("/api/decision", methods=["POST"])
 def set_decision():
     data = request.get_json()
     username = data.get("username", "")
-    decision = data.get("decision", "undecided")
-    notes = data.get("notes")
     if not username:
         return jsonify({"error": "missing username"}), 400
-    conn = get_db()
-    conn.execute(
-        "INSERT INTO decisions (username, decision, notes) VALUES (?, ?, ?) "
-        "ON CONFLICT(username) DO UPDATE SET decision=excluded.decision, notes=excluded.notes",
-        (username, decision, notes),
-    )
-    conn.commit()
-    conn.close()
+    save_decisions([{
+        "username": username,
+        "decision": data.get("decision", "undecided"),
+        "notes": data.get("notes"),
+    }])
     return jsonify({"ok": True})
 
 
+@app.route("/api/decisions", methods=["POST"])
+def set_decisions():
+    """Bulk upsert in one transaction.
+
+    Body: {"updates": [{"username", "decision"?, "notes"?}, ...]} and/or
+    {"filter": {"q", "status", "decision"}, "set": {"decision"?, "notes"?}}
+    to apply one change to every account matching the grid's filters.
+    """
+    data = request.get_json() or {}
+    updates = list(data.get("updates") or [])
+    if any(not isinstance(u, dict) or not u.get("username") for u in updates):
+        return jsonify({"error": "every update needs a username"}), 400
+    if data.get("filter") is not None:
+        f, change = data["filter"], data.get("set")
+        if not isinstance(f, dict):
+            return jsonify({"error": "filter must be an object"}), 400
+        if not isinstance(change, dict) or not {"decision", "notes"} & change.keys():
+            return jsonify({"error": "set needs a decision and/or notes"}), 400
+        for username in matching_usernames(
+            q=(f.get("q") or "").strip(),
+            status=f.get("status", "all"),
+            decision=f.get("decision", "all"),
+        ):
+            updates.append(dict(change, username=username))
+    updated = save_decisions(updates) if updates else 0
+    return jsonify({"ok": True, "updated": updated})
+
+
 @app.route("/api/people", methods=["GET"])
 def get_people():
-    conn = get_db()
-    rows = conn.execute("SELECT id, name, notes FROM people ORDER BY added_at DESC").fetchall()
-    conn.close()
-    return jsonify([{"id": r[0], "name": r[1], "notes": r[2] or ""} for r in rows])
+    def build():
+        rows = get_db().execute("SELECT id, name, notes FROM people ORDER BY added_at DESC").fetchall()
+        return [{"id": r[0], "name": r[1], "notes": r[2] or ""} for r in rows]
+
+    return _json_response(f"{DB_PATH}:{_people_version}", build)
 
 
 @app.route("/api/people", methods=["POST"])
@@ -143,8 +738,8 @@ def add_person():
     conn = get_db()
     cur = conn.execute("INSERT INTO people (name, notes) VALUES (?, ?)", (name, notes))
     conn.commit()
+    _people_changed()
     pid = cur.lastrowid
-    conn.close()
     return jsonify({"ok": True, "id": pid})
 
 
@@ -154,7 +749,7 @@ def update_person(pid):
     conn = get_db()
     conn.execute("UPDATE people SET notes = ? WHERE id = ?", (data.get("notes", ""), pid))
     conn.commit()
-    conn.close()
+    _people_changed()
     return jsonify({"ok": True})
 
 
@@ -163,9 +758,10 @@ def delete_person(pid):
     conn = get_db()
     conn.execute("DELETE FROM people WHERE id = ?", (pid,))
     conn.commit()
-    conn.close()
+    _people_changed()
     return jsonify({"ok": True})
 
 
 if __name__ == "__main__":
+    init_db()
     app.run(debug=True, port=5000)
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Time the igrestore pipeline on synthetic data at several scales.
+
+Usage:
+    python benchmarks/run_benchmarks.py                       # 1k, 10k and 100k accounts
+    python benchmarks/run_benchmarks.py --scales 1000,10000 -o before.json
+    python benchmarks/run_benchmarks.py -o after.json --compare before.json
+
+For each scale this generates a synthetic dataset (see synthetic.py) in a
+temp directory and times:
+  - parse_following.parse_streaming on the data.xml page
+  - igrestore.exports.parse_html_entries on every export file
+  - app.load_data, cold (index build) and warm (cached)
+  - /api/profiles latency for a handful of typical queries, via Flask's test client,
+    with the JSON body cache emptied before each sample and, separately, with cache hits
+
+The JSON report records the git commit so runs can be compared across commits.
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+import synthetic  # noqa: E402
+
+API_QUERIES = (
+    "",
+    "decision=undecided",
+    "sort=followers-desc",
+    "status=active&sort=name",
+    "q=chen",
+    "q=photography&decision=all",
+)
+API_REPEATS = 20
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def point_app_at(app_module, data_dir):
+    """Retarget app.py's module-level paths and drop its caches."""
+    app_module.FOLLOWING_CSV = os.path.join(data_dir, "following.csv")
+    app_module.PROFILES_JSON = os.path.join(data_dir, "profiles.json")
+    app_module.PICS_DIR = os.path.join(data_dir, "pics")
+    app_module.THUMBS_DIR = os.path.join(data_dir, "thumbs")
+    app_module.AVATAR_PACK = os.path.join(data_dir, "avatars.pack")
+    app_module.DB_PATH = os.path.join(data_dir, "decisions.db")
+    app_module.METRICS_DB = os.path.join(data_dir, "profiles.metrics.db")
+    app_module._index["mtimes"] = None
+    app_module._decisions = None
+
+
+def bench_scale(n, work_dir):
+    import app
+    import parse_following
+    from igrestore import exports
+
+    data_dir = os.path.join(work_dir, f"n{n}")
+    info, gen_s = timed(synthetic.generate, data_dir, n)
+    print(f"  generated {n} accounts, {info['followers']} followers in {info['follower_shards']} shards ({gen_s:.1f}s)")
+    report = {"accounts": n, "followers": info["followers"], "generate_s": gen_s}
+
+    rows, report["parse_following_s"] = timed(parse_following.parse_streaming, os.path.join(data_dir, "data.xml"))
+    assert len(rows) == n, f"parse_following found {len(rows)} of {n} accounts"
+    assert parse_following.parse_streaming(os.path.join(data_dir, "data.xml"), chunk_size=97) == rows, \
+        "parse_following output depends on where chunk boundaries fall"
+
+    total = 0.0
+    for path in sorted(glob.glob(os.path.join(info["export_dir"], "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        _, elapsed = timed(exports.parse_html_entries, html)
+        total += elapsed
+    report["parse_html_entries_s"] = total
+
+    point_app_at(app, data_dir)
+    _, report["load_data_cold_s"] = timed(app.load_data)
+    _, report["load_data_warm_s"] = timed(app.load_data)
+
+    client = app.app.test_client()
+
+    def sample(query, cached):
+        """Latency percentiles for one query. Uncached samples empty the JSON body cache first."""
+        samples = []
+        client.get(f"/api/profiles?{query}")
+        for _ in range(API_REPEATS):
+            if not cached:
+                with app._json_lock:
+                    app._json_bodies.clear()
+            start = time.perf_counter()
+            resp = client.get(f"/api/profiles?{query}")
+            samples.append(time.perf_counter() - start)
+            assert resp.status_code == 200, resp.status_code
+        samples.sort()
+        return {
+            "p50_ms": statistics.median(samples) * 1000,
+            "p95_ms": samples[int(len(samples) * 0.95) - 1] * 1000,
+        }
+
+    # api_profiles measures the query itself; api_profiles_cached, repeats
+    # served from the encoded-body cache
+    report["api_profiles"] = {query or "(default)": sample(query, False) for query in API_QUERIES}
+    report["api_profiles_cached"] = {query or "(default)": sample(query, True) for query in API_QUERIES}
+    return report
+
+
+def flatten(report):
+    """{"10000.api_profiles.q=chen.p50_ms": 1.2, ...} for comparing two reports."""
+    out = {}
+
+    def walk(prefix, value):
+        if isinstance(value, dict):
+            for k, v in value.items():
+                walk(f"{prefix}.{k}" if prefix else k, v)
+        elif isinstance(value, (int, float)) and (prefix.endswith("_s") or prefix.endswith("_ms")):
+            out[prefix] = value
+
+    walk("", report["scales"])
+    return out
+
+
+def compare(old, new):
+    old_flat, new_flat = flatten(old), flatten(new)
+    print(f"\nCompared with {old.get('commit') or '?'} -> {new.get('commit') or '?'}:")
+    for key in sorted(new_flat):
+        if key not in old_flat or not old_flat[key]:
+            continue
+        ratio = new_flat[key] / old_flat[key]
+        flag = "  <-- slower" if ratio > 1.2 else ""
+        print(f"  {key:<60} {old_flat[key]:10.4f} -> {new_flat[key]:10.4f}  x{ratio:.2f}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the igrestore pipeline on synthetic data")
+    parser.add_argument("--scales", default="1000,10000,100000", help="Comma-separated account counts")
+    parser.add_argument("-o", "--output", default="bench_report.json", help="Where to write the JSON report")
+    parser.add_argument("--compare", help="Earlier report to compare against")
+    parser.add_argument("--keep", action="store_true", help="Keep the generated data directory")
+    args = parser.parse_args()
+
+    scales = [int(s) for s in args.scales.split(",") if s]
+    work_dir = tempfile.mkdtemp(prefix="igrestore-bench-")
+    report = {
+        "generated_at": datetime.now().isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scales": {},
+    }
+    try:
+        for n in scales:
+            print(f"Scale {n}:")
+            result = bench_scale(n, work_dir)
+            report["scales"][str(n)] = result
+            for key, value in result.items():
+                if key.endswith("_s"):
+                    print(f"  {key:<24} {value:9.3f}s")
+            for section, label in (("api_profiles", ""), ("api_profiles_cached", " (cached)")):
+                for query, lat in result[section].items():
+                    print(f"  /api/profiles {query + label:<39} p50 {lat['p50_ms']:7.2f}ms  p95 {lat['p95_ms']:7.2f}ms")
+    finally:
+        if args.keep:
+            print(f"Data kept in {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
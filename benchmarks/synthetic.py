@@ -0,0 +1,166 @@
+"""Generate synthetic Instagram data at a given scale for the benchmarks.
+
+Produces, under one output directory:
+
+    data.xml                 saved "Following" page in the layout parse_following.py expects
+    following.csv            what parse_following.py would extract from it
+    profiles.json            fetch_profiles.py-style results
+    decisions.db             a decisions table with roughly a third of accounts triaged
+    pics/<username>.jpg      placeholder pictures for ~90% of accounts
+    export/connections/followers_and_following/
+        followers_N.html     follower shards in the Download Your Information layout
+        following.html
+        pending_follow_requests.html
+"""
+
+import csv
+import json
+import os
+import random
+import sqlite3
+
+WORDS = ("coffee", "photography", "travel", "sf", "nyc", "la", "design", "music", "food", "dog",
+         "climbing", "film", "art", "runner", "engineer", "student", "ucla", "berkeley", "books", "surf")
+FIRST = ("alex", "sam", "jordan", "taylor", "chris", "jamie", "casey", "morgan", "riley", "drew")
+LAST = ("chen", "lee", "nguyen", "kim", "park", "wong", "garcia", "smith", "patel", "lin")
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+DECISIONS = ("will_follow", "maybe_follow", "dont_follow", "already_followed")
+
+DISPLAY_SPAN_CLASS = "x1lliihq x193iq5w x6ikm8r x10wlt62 xlyipyv xuxw1ft"
+# Roughly matches the wrapper markup Instagram puts around each row
+ROW_FILLER = "".join(f'<div class="x9f619 x1n2onr6 x1ja2u2z x78zum5 xdt5ytf x{i}">' for i in range(12))
+ROW_FILLER_END = "</div>" * 12
+FOLLOWERS_PER_SHARD = 10000
+
+
+def usernames(n, seed):
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < n:
+        names.add(f"{rng.choice(FIRST)}{rng.choice(('', '.', '_'))}{rng.choice(LAST)}{rng.randrange(100000)}")
+    return sorted(names, key=lambda _: rng.random())
+
+
+def pic_url(rng, username):
+    asset = f"{rng.randrange(10**8, 10**9)}_{rng.randrange(10**16, 10**17)}_{rng.randrange(10**18, 10**19)}_n.jpg"
+    return (f"https://scontent-lax3-1.cdninstagram.com/v/t51.2885-19/{asset}"
+            f"?stp=dst-jpg_s150x150&_nc_ht=scontent-lax3-1.cdninstagram.com"
+            f"&_nc_ohc={rng.randrange(16**12):012x}&oh=00_{rng.randrange(16**20):020x}&oe={rng.randrange(16**8):08X}")
+
+
+def export_date(rng):
+    return f"{rng.choice(MONTHS)} {rng.randint(1, 28):02d}, {rng.randint(2015, 2026)} {rng.randint(1, 12)}:{rng.randint(0, 59):02d} {rng.choice('ap')}m"
+
+
+def write_following_page(path, accounts):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<html><body><div>")
+        for username, display_name, url in accounts:
+            src = url.replace("&", "&amp;")
+            f.write(
+                f"{ROW_FILLER}<span role=\"link\"><img alt=\"{username}'s profile picture\" "
+                f"class=\"xpdipgo x972fbf\" crossorigin=\"anonymous\" src=\"{src}\"></span>"
+                f"<div class=\"x1rg5ohu\"><a class=\"x1i10hfl xjbqb8w notranslate _a6hd\" href=\"/{username}/\" "
+                f"role=\"link\" tabindex=\"0\"><span class=\"_ap3a _aaco\" dir=\"auto\">{username}</span></a></div>"
+                f"<span class=\"x1lliihq x1plvlek\" dir=\"auto\"><span class=\"{DISPLAY_SPAN_CLASS}\">{display_name}</span></span>"
+                f"{ROW_FILLER_END}\n"
+            )
+        f.write("</div></body></html>")
+
+
+def export_entry(username, date, following=False):
+    if following:
+        return (f'<div class="pam"><h2 class="_a6-h">{username}</h2><div class="_a6-p"><div><div>'
+                f'<a target="_blank" href="https://www.instagram.com/_u/{username}">https://www.instagram.com/_u/{username}</a>'
+                f'</div><div>{date}</div></div></div></div>\n')
+    return (f'<div class="pam"><div class="_a6-p"><div><div>'
+            f'<a target="_blank" href="https://www.instagram.com/{username}">{username}</a>'
+            f'</div><div>{date}</div></div></div></div>\n')
+
+
+def write_export_file(path, entries, following=False):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<html><head><title>Export</title></head><body><main>")
+        for username, date in entries:
+            f.write(export_entry(username, date, following))
+        f.write("</main></body></html>")
+
+
+def generate(out_dir, n, seed=0):
+    """Write a synthetic dataset with `n` followed accounts into out_dir."""
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    names = usernames(n, seed)
+
+    accounts = []
+    profiles = {}
+    for username in names:
+        display_name = f"{rng.choice(FIRST).title()} {rng.choice(LAST).title()}"
+        url = pic_url(rng, username)
+        accounts.append((username, display_name, url))
+        status = rng.choices(("active", "not_found", "http_error"), (90, 8, 2))[0]
+        profile = {"username": username, "status": status}
+        if status == "active":
+            profile.update({
+                "full_name": display_name,
+                "profile_pic_url": url,
+                "followers": int(rng.paretovariate(1.2) * 100),
+                "following": rng.randrange(20, 3000),
+                "posts": rng.randrange(0, 2000),
+                "is_private": rng.random() < 0.4,
+                "is_verified": rng.random() < 0.01,
+                "biography": " ".join(rng.choices(WORDS, k=rng.randrange(0, 12))),
+            })
+        profile["display_name"] = display_name
+        profile["profile_url"] = f"https://instagram.com/{username}"
+        profiles[username] = profile
+
+    write_following_page(os.path.join(out_dir, "data.xml"), accounts)
+    with open(os.path.join(out_dir, "following.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(["username", "display_name", "profile_url", "profile_pic_url"])
+        writer.writerows((u, d, f"https://instagram.com/{u}", url) for u, d, url in accounts)
+    with open(os.path.join(out_dir, "profiles.json"), "w") as f:
+        json.dump(profiles, f, indent=2)
+
+    pics_dir = os.path.join(out_dir, "pics")
+    os.makedirs(pics_dir, exist_ok=True)
+    placeholder = bytes(rng.randrange(256) for _ in range(2048))
+    for username in names:
+        if rng.random() < 0.9:
+            with open(os.path.join(pics_dir, f"{username}.jpg"), "wb") as f:
+                f.write(placeholder)
+
+    conn = sqlite3.connect(os.path.join(out_dir, "decisions.db"))
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS decisions "
+        "(username TEXT PRIMARY KEY, decision TEXT NOT NULL DEFAULT 'undecided', notes TEXT DEFAULT '')"
+    )
+    conn.executemany(
+        "INSERT OR REPLACE INTO decisions (username, decision, notes) VALUES (?, ?, ?)",
+        ((u, rng.choice(DECISIONS), rng.choice(("", "", "met at work", "college friend")))
+         for u in names if rng.random() < 0.33),
+    )
+    conn.commit()
+    conn.close()
+
+    # Followers overlap about half of the following list, plus fans
+    export_dir = os.path.join(out_dir, "export", "connections", "followers_and_following")
+    os.makedirs(export_dir, exist_ok=True)
+    followers = [u for u in names if rng.random() < 0.5] + usernames(n // 2, seed + 1)
+    rng.shuffle(followers)
+    shards = [followers[i:i + FOLLOWERS_PER_SHARD] for i in range(0, len(followers), FOLLOWERS_PER_SHARD)]
+    for i, shard in enumerate(shards, 1):
+        write_export_file(os.path.join(export_dir, f"followers_{i}.html"), [(u, export_date(rng)) for u in shard])
+    write_export_file(os.path.join(export_dir, "following.html"),
+                      [(u, export_date(rng)) for u in names], following=True)
+    pending = usernames(max(n // 100, 1), seed + 2)
+    write_export_file(os.path.join(export_dir, "pending_follow_requests.html"),
+                      [(u, export_date(rng)) for u in pending])
+
+    return {
+        "accounts": n,
+        "followers": len(followers),
+        "follower_shards": len(shards),
+        "export_dir": export_dir,
+    }
@@ -0,0 +1,16 @@
+"""Code shared by the restore app at the repo root and the unfollower tools in unfollowers/.
+
+Modules:
+    fetcher       rate-limited, parallel profile fetching
+    journal       append-only fetch journal, compacted into the profile snapshot
+    snapshot      the profiles.db snapshot format
+    metrics       per-profile count history across fetches
+    refresh       which profiles a fetch run should (re)request
+    store         loading profiles and picture availability for the web apps
+    fsutil        atomic file writes and source mtimes
+    pics          parallel conditional picture downloads
+    avatar_store  every picture packed into one memory-mapped file
+    thumbnails    small WebP/JPEG variants of the pictures
+    exports       parsing an Instagram data export
+    history       stored export snapshots and diffs between them
+"""
@@ -0,0 +1,107 @@
+"""Packed avatar store: every profile picture in one memory-mapped file.
+
+Layout of `avatars.pack`:
+
+    MAGIC | picture bytes, back to back | JSON index | index offset (8 bytes LE) | MAGIC
+
+The index maps username -> [offset, length, sha1, source mtime_ns]. The pack
+is always replaced whole, with fsutil.atomic_write(). AvatarStore maps it
+read-only and hands out memoryview slices of the map, so looking up a
+picture is a dict hit instead of a stat and an open per file. The index's
+SHA-1 doubles as the HTTP ETag.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+
+from igrestore.fsutil import atomic_write
+
+MAGIC = b"IGAVATAR1\n"
+FOOTER = struct.Struct("<Q")
+
+
+def pack_path_for(pics_dir):
+    return os.path.join(os.path.dirname(os.path.abspath(pics_dir)), "avatars.pack")
+
+
+def write_pack(pics_dir, path=None):
+    """Pack every `<username>.jpg` in pics_dir into `path`. Returns the entry count."""
+    path = path or pack_path_for(pics_dir)
+    index = {}
+    with atomic_write(path, ".pack") as tmp, open(tmp, "wb") as out:
+        out.write(MAGIC)
+        with os.scandir(pics_dir) as it:
+            entries = sorted((e for e in it if e.name.endswith(".jpg")), key=lambda e: e.name)
+        for entry in entries:
+            with open(entry.path, "rb") as f:
+                data = f.read()
+            index[entry.name[:-4]] = [out.tell(), len(data), hashlib.sha1(data).hexdigest(),
+                                     entry.stat().st_mtime_ns]
+            out.write(data)
+        index_offset = out.tell()
+        out.write(json.dumps(index, separators=(",", ":")).encode())
+        out.write(FOOTER.pack(index_offset) + MAGIC)
+        out.flush()
+        os.fsync(out.fileno())
+    return len(index)
+
+
+class AvatarStore:
+    """Read-only view of a pack file; reopens itself when the pack is replaced."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime = None
+        # (mmap, index), swapped as one so readers never mix two packs
+        self._state = (None, {})
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            index, mapped = {}, None
+            if mtime is not None:
+                with open(self.path, "rb") as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                tail = len(MAGIC) + FOOTER.size
+                if mapped[:len(MAGIC)] != MAGIC or mapped[-len(MAGIC):] != MAGIC:
+                    raise ValueError(f"{self.path} is not an avatar pack")
+                (index_offset,) = FOOTER.unpack(mapped[-tail:-len(MAGIC)])
+                index = json.loads(mapped[index_offset:-tail])
+            # the old map is left to the garbage collector: views handed out
+            # earlier may still be in use
+            self._state, self._mtime = (mapped, index), mtime
+
+    def __contains__(self, username):
+        self._refresh()
+        return username in self._state[1]
+
+    def __len__(self):
+        self._refresh()
+        return len(self._state[1])
+
+    def entries(self):
+        """{username: [offset, length, sha1, mtime_ns]} for every packed picture."""
+        self._refresh()
+        return self._state[1]
+
+    def get(self, username):
+        """(memoryview of the picture bytes, sha1, source mtime_ns) or None."""
+        self._refresh()
+        mapped, index = self._state
+        entry = index.get(username)
+        if entry is None:
+            return None
+        offset, length, sha1, mtime_ns = entry
+        return memoryview(mapped)[offset:offset + length], sha1, mtime_ns
@@ -0,0 +1,339 @@
+"""Parsers for the followers/following files in an Instagram data export.
+
+Links and dates are matched with two regexes. parse_html_entries() pairs
+each link with the next date by bisect. parse_html_stream() does the same
+in one pass over a file read in chunks. Exports downloaded in JSON format
+go through parse_json_stream(), which decodes one list entry at a time.
+load_export() detects the format and parses every file of an export, in a
+process pool when asked to.
+
+An export is either an unpacked folder or the downloaded .zip. Zip members
+are streamed straight out of the archive; nothing is extracted, and the
+media in the rest of the archive is never read.
+"""
+
+import bisect
+import io
+import json
+import os
+import posixpath
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+CONNECTIONS_DIR = "connections/followers_and_following"
+# export formats, in the order they're looked for
+FORMATS = ("html", "json")
+
+
+def find_export_dir(base_dir):
+    """Auto-detect the Instagram export folder."""
+    for entry in os.listdir(base_dir):
+        path = os.path.join(base_dir, entry)
+        if os.path.isdir(path) and "instagram" in entry.lower():
+            connections = os.path.join(path, "connections", "followers_and_following")
+            if os.path.isdir(connections):
+                return connections
+    # Maybe they put files directly in the folder
+    if os.path.exists(os.path.join(base_dir, "connections", "followers_and_following")):
+        return os.path.join(base_dir, "connections", "followers_and_following")
+    return None
+
+
+def is_export_zip(path):
+    return os.path.isfile(path) and zipfile.is_zipfile(path)
+
+
+def find_export(base_dir):
+    """An unpacked export folder in base_dir, else an export .zip there, else None."""
+    found = find_export_dir(base_dir)
+    if found:
+        return found
+    zips = sorted(
+        os.path.join(base_dir, entry) for entry in os.listdir(base_dir)
+        if entry.lower().endswith(".zip")
+    )
+    # "instagram-<user>-<date>.zip" first, then any other archive with the right members
+    zips.sort(key=lambda path: "instagram" not in os.path.basename(path).lower())
+    for path in zips:
+        if is_export_zip(path) and _zip_connections(path):
+            return path
+    return None
+
+
+# Extract username from instagram.com links
+# Handles both /username and /_u/username formats
+LINK_PATTERN = re.compile(
+    r'href="https://www\.instagram\.com/(?:_u/)?([^"/?]+)"'
+)
+# Date pattern: "Mon DD, YYYY H:MM am/pm" appearing in <div> after the link
+DATE_PATTERN = re.compile(
+    r'</a></div><div>([A-Z][a-z]{2} \d{1,2}, \d{4} \d{1,2}:\d{2} [ap]m)</div>'
+)
+# Either of the above, for the single-pass streaming parser
+TOKEN_PATTERN = re.compile(f"{LINK_PATTERN.pattern}|{DATE_PATTERN.pattern}")
+
+# A date belongs to a link if it starts within this many chars after the link
+DATE_WINDOW = 200
+# Bytes kept back between chunks so no token or date window is cut in half
+STREAM_OVERLAP = 4096
+STREAM_CHUNK_SIZE = 1 << 20
+
+
+def parse_html_entries(html_content):
+    """Extract usernames and dates from Instagram export HTML.
+
+    The HTML has entries like:
+      <a target="_blank" href="https://www.instagram.com/username">username</a>
+      <div>Feb 08, 2026 1:17 pm</div>
+
+    Or for following.html:
+      <h2 class="...">username</h2>
+      <a target="_blank" href="https://www.instagram.com/_u/username">...</a>
+      <div>Feb 08, 2026 1:17 pm</div>
+
+    Each link is paired with the first date that starts after it, if that
+    date is within DATE_WINDOW chars. Date positions are sorted, so the lookup
+    is a bisect per link.
+
+    Returns dict of {username: {"date": "Feb 08, 2026 1:17 pm"}}
+    """
+    results = {}
+
+    dates = list(DATE_PATTERN.finditer(html_content))
+    date_starts = [m.start() for m in dates]
+
+    for link_match in LINK_PATTERN.finditer(html_content):
+        username = link_match.group(1).strip()
+        if not username:
+            continue
+
+        # Find the closest date after this link
+        link_end = link_match.end()
+        best_date = ""
+        i = bisect.bisect_right(date_starts, link_end)
+        if i < len(dates) and date_starts[i] - link_end < DATE_WINDOW:
+            best_date = dates[i].group(1)
+
+        if username not in results:
+            results[username] = {"date": best_date}
+
+    return results
+
+
+def parse_html_stream(fh, chunk_size=STREAM_CHUNK_SIZE):
+    """Streaming variant of parse_html_entries for a text file object.
+
+    Reads `fh` in chunks and scans links and dates in a single pass, holding
+    back the last STREAM_OVERLAP chars of each chunk so tokens that straddle
+    a boundary are seen whole. Memory stays at about one chunk regardless of
+    file size. Returns the same dict as parse_html_entries.
+    """
+    results = {}
+    awaiting = []  # (username, absolute end offset) of links still looking for a date
+    buffer = ""
+    offset = 0  # absolute position of buffer[0]
+    eof = False
+
+    def resolve(date, date_start):
+        for username, link_end in awaiting:
+            if username not in results:
+                in_window = date is not None and date_start - link_end < DATE_WINDOW
+                results[username] = {"date": date if in_window else ""}
+        awaiting.clear()
+
+    while not eof:
+        chunk = fh.read(chunk_size)
+        eof = not chunk
+        buffer += chunk
+        limit = len(buffer) if eof else max(len(buffer) - STREAM_OVERLAP, 0)
+        consumed = 0
+        for m in TOKEN_PATTERN.finditer(buffer):
+            if m.start() >= limit:
+                break
+            consumed = m.end()
+            if m.group(1) is not None:
+                username = m.group(1).strip()
+                if username:
+                    awaiting.append((username, offset + m.end()))
+            else:
+                resolve(m.group(2), offset + m.start())
+        if not eof:
+            # everything before `limit` has been scanned; keep the rest
+            keep_from = max(consumed, limit)
+            buffer = buffer[keep_from:]
+            offset += keep_from
+
+    resolve(None, None)
+    return results
+
+
+# JSON exports list entries like
+#   {"title": "", "string_list_data": [{"href": "https://www.instagram.com/username",
+#                                       "value": "username", "timestamp": 1770556620}]}
+# following.json and pending_follow_requests.json wrap the list in an object
+# and put the username in "title" instead of "value".
+JSON_LINK_PATTERN = re.compile(r"https://www\.instagram\.com/(?:_u/)?([^/?]+)")
+# %b without strftime, which is most of the cost of export_date
+MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def export_date(timestamp):
+    """A Unix timestamp in the HTML export's "Feb 08, 2026 1:17 pm" form, local time."""
+    dt = datetime.fromtimestamp(timestamp)
+    return (f"{MONTHS[dt.month - 1]} {dt.day:02d}, {dt.year} "
+            f"{dt.hour % 12 or 12}:{dt.minute:02d} {'am' if dt.hour < 12 else 'pm'}")
+
+
+def iter_json_list(fh, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield the items of the first JSON array in a text file object.
+
+    The file is read in chunks and each item is decoded on its own, so
+    memory stays at about one chunk however long the list is.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = -1
+    while pos < 0:
+        chunk = fh.read(chunk_size)
+        if not chunk:
+            return
+        buffer += chunk
+        pos = buffer.find("[")
+        if pos < 0:
+            buffer = ""
+    pos += 1
+    eof = False
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        try:
+            if pos == len(buffer):
+                raise json.JSONDecodeError("need more data", buffer, pos)
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # an item cut off by the chunk boundary, most likely
+            if eof:
+                raise
+            chunk = fh.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+            continue
+        yield item
+        pos = end
+
+
+def parse_json_stream(fh, chunk_size=STREAM_CHUNK_SIZE):
+    """Parse a JSON-format export file. Returns the same dict as parse_html_entries."""
+    results = {}
+    for item in iter_json_list(fh, chunk_size):
+        for entry in item.get("string_list_data") or ():
+            username = entry.get("value") or item.get("title")
+            if not username:
+                link = JSON_LINK_PATTERN.match(entry.get("href") or "")
+                username = link.group(1) if link else ""
+            username = username.strip()
+            if username and username not in results:
+                timestamp = entry.get("timestamp")
+                results[username] = {"date": export_date(timestamp) if timestamp else ""}
+    return results
+
+
+def parse_export_file(path):
+    """Parse an export file: a path, or a (zip path, member name) pair."""
+    name = file_name(path)
+    parse = parse_json_stream if name.endswith(".json") else parse_html_stream
+    if isinstance(path, tuple):
+        zip_path, member = path
+        with zipfile.ZipFile(zip_path) as zf, zf.open(member) as raw:
+            return parse(io.TextIOWrapper(raw, encoding="utf-8"))
+    with open(path, encoding="utf-8") as fh:
+        return parse(fh)
+
+
+def file_name(path):
+    return posixpath.basename(path[1]) if isinstance(path, tuple) else os.path.basename(path)
+
+
+def _select_files(names, where):
+    """(follower shards, following, pending or None) names, in the export's format."""
+    for fmt in FORMATS:
+        shard = re.compile(rf"followers_\d+\.{fmt}")
+        shards = sorted(n for n in names if shard.fullmatch(n))
+        if shards:
+            break
+    else:
+        raise FileNotFoundError(f"No followers_*.html or followers_*.json files found in {where}")
+    following = f"following.{fmt}"
+    if following not in names:
+        raise FileNotFoundError(f"{following} not found in {where}")
+    pending = f"pending_follow_requests.{fmt}"
+    return shards, following, pending if pending in names else None
+
+
+def _zip_connections(zip_path):
+    """{file name: member name} for the followers_and_following files in a zip."""
+    with zipfile.ZipFile(zip_path) as zf:
+        names = zf.namelist()
+    return {
+        posixpath.basename(name): name for name in names
+        if posixpath.dirname(name).endswith(CONNECTIONS_DIR)
+    }
+
+
+def export_files(source):
+    """(follower shards, following, pending or None) for an export folder or .zip.
+
+    Folder files are paths; zip files are (zip path, member name) pairs.
+    """
+    if is_export_zip(source):
+        members = _zip_connections(source)
+        where = f"{CONNECTIONS_DIR}/ in {source}"
+
+        def locate(name):
+            return (source, members[name])
+    else:
+        nested = os.path.join(source, "connections", "followers_and_following")
+        if os.path.isdir(nested):
+            source = nested
+        members = os.listdir(source) if os.path.isdir(source) else []
+        where = source
+
+        def locate(name):
+            return os.path.join(source, name)
+    shards, following, pending = _select_files(members, where)
+    return [locate(n) for n in shards], locate(following), locate(pending) if pending else None
+
+
+def parse_files(paths, workers=1):
+    """Parse export files, in a process pool when workers > 1. Results keep input order."""
+    if workers <= 1 or len(paths) <= 1:
+        return [parse_export_file(p) for p in paths]
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+        return list(pool.map(parse_export_file, paths))
+
+
+def load_export(source, workers=1):
+    """Parse the follower shards, following list and pending requests together.
+
+    `source` is an export folder or .zip, in HTML or JSON format. Returns (followers, following,
+    pending). Shards are merged in sorted file order with dict.update,
+    exactly as when they were parsed one by one.
+    """
+    shards, following_path, pending_path = export_files(source)
+
+    paths = shards + [following_path] + ([pending_path] if pending_path else [])
+    for path in paths:
+        print(f"  Loading {file_name(path)}...")
+    parsed = parse_files(paths, workers)
+
+    followers = {}
+    for shard in parsed[:len(shards)]:
+        followers.update(shard)
+    following = parsed[len(shards)]
+    pending = parsed[len(shards) + 1] if pending_path else {}
+    return followers, following, pending
@@ -0,0 +1,205 @@
+"""Profile fetching shared by both fetch_profiles.py scripts.
+
+fetch_all() runs the requests in a thread pool behind one token-bucket
+RateLimiter. Every result is stamped with fetched_at and merged over the
+previous profile, then journaled as soon as it arrives.
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from igrestore.refresh import merge_result, now_iso
+
+API_URL = "https://www.instagram.com/api/v1/users/web_profile_info/"
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+                  "AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/125.0.0.0 Safari/537.36",
+    "Accept": "*/*",
+    "Accept-Language": "en-US,en;q=0.9",
+    "X-IG-App-ID": "936619743392459",
+    "X-Requested-With": "XMLHttpRequest",
+}
+
+
+def fetch_profile(username, session, api_url=API_URL):
+    try:
+        resp = session.get(
+            api_url,
+            params={"username": username},
+            headers=HEADERS,
+            timeout=15,
+        )
+    except requests.RequestException as e:
+        return {"username": username, "status": "error", "error": str(e)}
+
+    if resp.status_code == 404:
+        return {"username": username, "status": "not_found"}
+
+    if resp.status_code == 401 or resp.status_code == 403:
+        return {"username": username, "status": "login_required", "http_status": resp.status_code}
+
+    if resp.status_code != 200:
+        return {
+            "username": username,
+            "status": "http_error",
+            "http_status": resp.status_code,
+        }
+
+    try:
+        data = resp.json()
+    except (ValueError, json.JSONDecodeError):
+        return {"username": username, "status": "error", "error": "invalid json"}
+
+    user = data.get("data", {}).get("user")
+    if user is None:
+        return {"username": username, "status": "not_found"}
+
+    return {
+        "username": username,
+        "status": "active",
+        "full_name": user.get("full_name", ""),
+        "profile_pic_url": user.get("profile_pic_url_hd") or user.get("profile_pic_url", ""),
+        "followers": user.get("edge_followed_by", {}).get("count"),
+        "following": user.get("edge_follow", {}).get("count"),
+        "posts": user.get("edge_owner_to_timeline_media", {}).get("count"),
+        "is_private": user.get("is_private", False),
+        "is_verified": user.get("is_verified", False),
+        "biography": user.get("biography", ""),
+    }
+
+
+# Responses that mean Instagram wants us to slow down
+THROTTLE_STATUSES = (429, 401, 403)
+
+
+class RateLimiter:
+    """Token bucket shared by all fetch workers.
+
+    Starts at `rate` requests/second. A throttled response halves the rate
+    (down to `min_rate`) and pauses every worker with exponential backoff;
+    each good response creeps the rate back up towards the starting value.
+    """
+
+    def __init__(self, rate, burst=1, min_rate=0.05, backoff=30, max_backoff=600):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.burst = burst
+        self.base_backoff = backoff
+        self.max_backoff = max_backoff
+        self._backoff = backoff
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now >= self._paused_until:
+                    elapsed = max(now - self._updated, 0)
+                    self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+                else:
+                    wait = self._paused_until - now
+            time.sleep(wait)
+
+    def throttled(self):
+        with self._lock:
+            now = time.monotonic()
+            self.rate = max(self.min_rate, self.rate / 2)
+            if now >= self._paused_until:
+                self._paused_until = now + self._backoff
+                self._backoff = min(self._backoff * 2, self.max_backoff)
+            self._tokens = 0
+            self._updated = self._paused_until
+            return self._paused_until - now
+
+    def succeeded(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+            self._backoff = self.base_backoff
+
+
+def fetch_with_limiter(username, limiter, sessions, api_url=API_URL, max_retries=3, cookies=None):
+    """Fetch one profile through the shared limiter, retrying throttled attempts."""
+    if not hasattr(sessions, "session"):
+        sessions.session = requests.Session()
+        for name, value in (cookies or {}).items():
+            sessions.session.cookies.set(name, value, domain=".instagram.com")
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        result = fetch_profile(username, sessions.session, api_url)
+        if result.get("http_status") not in THROTTLE_STATUSES:
+            if result.get("status") != "error":
+                limiter.succeeded()
+            return result
+        pause = limiter.throttled()
+        print(f"\n⚠ {username}: HTTP {result['http_status']}, rate now {limiter.rate:.2f}/s, pausing {pause:.0f}s")
+    return result
+
+
+def fetch_all(usernames, profiles, journal, workers=4, rate=1.0, api_url=API_URL,
+              cookies=None, annotate=None, metrics=None):
+    """Fetch `usernames` into `profiles`, appending each result to `journal`.
+
+    `annotate(username, result)` may add fields to a result before it is
+    stored. Counts of active results also go to `metrics`, a MetricsStore.
+    On Ctrl-C pending fetches are cancelled and the journal is closed;
+    everything fetched so far is already journaled.
+    """
+    limiter = RateLimiter(rate, burst=max(1, workers))
+    sessions = threading.local()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(fetch_with_limiter, username, limiter, sessions, api_url, cookies=cookies): username
+            for username in usernames
+        }
+        try:
+            for i, future in enumerate(as_completed(futures)):
+                username = futures[future]
+                result = future.result()
+                if annotate:
+                    annotate(username, result)
+                result["fetched_at"] = now_iso()
+
+                merged = merge_result(profiles.get(username), result)
+                profiles[username] = merged
+                journal.append(merged)
+                if metrics is not None:
+                    metrics.append(result)
+                status = result.get("status", "unknown")
+                extra = ""
+                if status == "active":
+                    extra = f" ({result.get('followers', '?')} followers)"
+                elif merged is not result:
+                    extra = " (kept previous data)"
+                print(f"[{i + 1}/{len(futures)}] {username}... {status}{extra}")
+        except KeyboardInterrupt:
+            print(f"\nInterrupted, progress is journaled in {journal.journal_path}")
+            pool.shutdown(wait=False, cancel_futures=True)
+            journal.close()
+            raise
+        finally:
+            if metrics is not None:
+                metrics.close()
+
+
+def status_counts(profiles):
+    statuses = {}
+    for v in profiles.values():
+        s = v.get("status", "unknown")
+        statuses[s] = statuses.get(s, 0) + 1
+    return statuses
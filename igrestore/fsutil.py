@@ -0,0 +1,55 @@
+"""File helpers shared by the igrestore writers and both web apps.
+
+Every file the tools produce (snapshots, manifests, the avatar pack,
+pictures and thumbnails) goes through atomic_write(): it is written to a
+temp file in the target's folder and renamed over the target, so readers
+only ever see the old file or the complete new one.
+"""
+
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+class Discard(Exception):
+    """Raise inside atomic_write() to drop the temp file and leave the target as it was."""
+
+
+@contextmanager
+def atomic_write(path, suffix=""):
+    """Path of a temp file next to `path`, renamed over `path` when the block exits.
+
+    If the block raises, the temp file is removed instead. Discard is
+    swallowed; anything else propagates.
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".tmp-", suffix=suffix)
+    os.close(fd)
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    except Discard:
+        pass
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def write_json_atomic(path, data, **dump_kwargs):
+    """Write `data` as JSON to `path` through atomic_write(), synced to disk first."""
+    with atomic_write(path, ".json") as tmp:
+        with open(tmp, "w") as f:
+            json.dump(data, f, **dump_kwargs)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def mtimes_ns(*paths):
+    """Modification times of `paths` in ns, None for any that don't exist."""
+    mtimes = []
+    for path in paths:
+        try:
+            mtimes.append(os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            mtimes.append(None)
+    return tuple(mtimes)
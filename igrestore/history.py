@@ -0,0 +1,191 @@
+"""History of parsed exports, for diffing one against another.
+
+Each run of find_unfollowers.py stores its follower, following and pending
+lists in `history.db` as one snapshot: per list, the sorted usernames
+joined by newlines and zlib-compressed, so a 100k-follower snapshot is
+under 1 MB. A run whose lists match the latest snapshot adds nothing.
+
+Lists come back sorted, so diffs are sorted merges: one pass over both
+lists, with no sets built and results already in order.
+"""
+
+import argparse
+import hashlib
+import sqlite3
+import zlib
+from datetime import datetime
+
+LISTS = ("followers", "following", "pending")
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS snapshots "
+    "(id INTEGER PRIMARY KEY AUTOINCREMENT, taken_at TEXT NOT NULL, source TEXT, digest TEXT NOT NULL, "
+    "followers INTEGER, following INTEGER, pending INTEGER)",
+    "CREATE TABLE IF NOT EXISTS snapshot_lists "
+    "(snapshot_id INTEGER NOT NULL REFERENCES snapshots(id), list TEXT NOT NULL, usernames BLOB NOT NULL, "
+    "PRIMARY KEY (snapshot_id, list))",
+)
+
+
+def _connect(path):
+    conn = sqlite3.connect(path)
+    for statement in SCHEMA:
+        conn.execute(statement)
+    return conn
+
+
+def _pack(usernames):
+    return zlib.compress("\n".join(usernames).encode(), 6)
+
+
+def _unpack(blob):
+    text = zlib.decompress(blob).decode()
+    return text.split("\n") if text else []
+
+
+def record_snapshot(path, followers, following, pending, source=None):
+    """Store one export's lists (any iterables of usernames).
+
+    Returns (snapshot id, previous id or None). The id is the latest
+    snapshot's if the lists are unchanged since it.
+    """
+    lists = {name: sorted(users) for name, users in zip(LISTS, (followers, following, pending))}
+    digest = hashlib.sha1()
+    for name in LISTS:
+        digest.update(f"{name}\0{len(lists[name])}\0".encode())
+        digest.update("\n".join(lists[name]).encode())
+    digest = digest.hexdigest()
+
+    conn = _connect(path)
+    try:
+        with conn:
+            latest = conn.execute("SELECT id, digest FROM snapshots ORDER BY id DESC LIMIT 1").fetchone()
+            if latest and latest[1] == digest:
+                previous = conn.execute(
+                    "SELECT max(id) FROM snapshots WHERE id < ?", (latest[0],)
+                ).fetchone()[0]
+                return latest[0], previous
+            cur = conn.execute(
+                "INSERT INTO snapshots (taken_at, source, digest, followers, following, pending) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (datetime.now().isoformat(timespec="seconds"), source, digest,
+                 *(len(lists[name]) for name in LISTS)),
+            )
+            conn.executemany(
+                "INSERT INTO snapshot_lists (snapshot_id, list, usernames) VALUES (?, ?, ?)",
+                [(cur.lastrowid, name, _pack(lists[name])) for name in LISTS],
+            )
+            return cur.lastrowid, latest[0] if latest else None
+    finally:
+        conn.close()
+
+
+def list_snapshots(path):
+    """[(id, taken_at, source, followers, following, pending)], oldest first."""
+    conn = _connect(path)
+    try:
+        return conn.execute(
+            "SELECT id, taken_at, source, followers, following, pending FROM snapshots ORDER BY id"
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def load_snapshot(path, snapshot_id):
+    """{list name: sorted usernames} for one snapshot. KeyError if there is no such id."""
+    conn = _connect(path)
+    try:
+        rows = conn.execute(
+            "SELECT list, usernames FROM snapshot_lists WHERE snapshot_id = ?", (snapshot_id,)
+        ).fetchall()
+    finally:
+        conn.close()
+    if not rows:
+        raise KeyError(snapshot_id)
+    lists = {name: [] for name in LISTS}
+    lists.update((name, _unpack(blob)) for name, blob in rows)
+    return lists
+
+
+def merge_diff(a, b):
+    """(in a only, in b only) for two sorted lists of unique strings, in one merge pass."""
+    only_a, only_b = [], []
+    i = j = 0
+    len_a, len_b = len(a), len(b)
+    while i < len_a and j < len_b:
+        x, y = a[i], b[j]
+        if x == y:
+            i += 1
+            j += 1
+        elif x < y:
+            only_a.append(x)
+            i += 1
+        else:
+            only_b.append(y)
+            j += 1
+    only_a.extend(a[i:])
+    only_b.extend(b[j:])
+    return only_a, only_b
+
+
+def non_mutuals(lists):
+    """Accounts you follow that don't follow you, sorted."""
+    return merge_diff(lists["following"], lists["followers"])[0]
+
+
+def diff_snapshots(old, new):
+    """What changed between two loaded snapshots. Every list is sorted."""
+    lost_followers, new_followers = merge_diff(old["followers"], new["followers"])
+    no_longer_non_mutual, new_non_mutuals = merge_diff(non_mutuals(old), non_mutuals(new))
+    unfollowed, followed = merge_diff(old["following"], new["following"])
+    return {
+        "new_followers": new_followers,
+        "lost_followers": lost_followers,
+        "new_non_mutuals": new_non_mutuals,
+        "no_longer_non_mutual": no_longer_non_mutual,
+        "you_followed": followed,
+        "you_unfollowed": unfollowed,
+    }
+
+
+def print_diff(diff, limit=None):
+    for name, usernames in diff.items():
+        print(f"{name.replace('_', ' ').capitalize()}: {len(usernames)}")
+        for username in usernames[:limit]:
+            print(f"  @{username}")
+        if limit is not None and len(usernames) > limit:
+            print(f"  ... and {len(usernames) - limit} more")
+
+
+def main(default_db="history.db"):
+    parser = argparse.ArgumentParser(description="List stored export snapshots or diff two of them")
+    parser.add_argument("--db", default=default_db, help=f"Snapshot database (default: {default_db})")
+    parser.add_argument("old", nargs="?", type=int, help="Older snapshot id (default: the second newest)")
+    parser.add_argument("new", nargs="?", type=int, help="Newer snapshot id (default: the newest)")
+    parser.add_argument("--list", action="store_true", help="List snapshots and exit")
+    parser.add_argument("--limit", type=int, default=50, help="Usernames shown per change (default: 50)")
+    args = parser.parse_args()
+    db_path = args.db
+
+    snapshots = list_snapshots(db_path)
+    if args.list or len(snapshots) < 2 and args.old is None:
+        for sid, taken_at, source, followers, following, pending in snapshots:
+            print(f"  #{sid:<4} {taken_at}  {followers:>7} followers  {following:>7} following  "
+                  f"{pending:>5} pending  {source or ''}")
+        if not snapshots:
+            print("No snapshots yet. Run find_unfollowers.py to record one.")
+        elif not args.list:
+            print("Only one snapshot so far; nothing to diff.")
+        return
+
+    old_id = args.old if args.old is not None else snapshots[-2][0]
+    new_id = args.new if args.new is not None else snapshots[-1][0]
+    try:
+        old, new = load_snapshot(db_path, old_id), load_snapshot(db_path, new_id)
+    except KeyError as e:
+        raise SystemExit(f"No snapshot #{e.args[0]}; see --list")
+    print(f"Snapshot #{old_id} -> #{new_id}")
+    print_diff(diff_snapshots(old, new), args.limit)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Append-only journal for profile fetch progress.
+
+Fetch results are appended to `<profiles>.journal.jsonl` one JSON line at a
+time as they arrive, instead of re-serializing the whole profiles dict. On
+resume the journal is replayed over the last snapshot (`profiles.db`, see
+snapshot.py, or `profiles.json` before the first compaction). At the end
+of a run, or on demand, it is compacted into a fresh snapshot that
+replaces the old one atomically, after which the journal is truncated. A
+line torn by a crash mid-append is ignored.
+"""
+
+import json
+import os
+
+from igrestore.snapshot import read_snapshot, snapshot_path_for, write_snapshot
+
+
+def journal_path_for(profiles_path):
+    root, _ = os.path.splitext(profiles_path)
+    return root + ".journal.jsonl"
+
+
+class ProfileJournal:
+    def __init__(self, profiles_path, journal_path=None):
+        self.profiles_path = profiles_path
+        self.journal_path = journal_path or journal_path_for(profiles_path)
+        self.snapshot_path = snapshot_path_for(profiles_path)
+        self._fh = None
+        self.replayed = 0
+
+    def load(self, columns=None):
+        """Return the last snapshot with every journaled result applied.
+
+        `columns` limits the fields read per profile, as in read_snapshot.
+        """
+        profiles = {}
+        if os.path.exists(self.snapshot_path):
+            profiles = read_snapshot(self.snapshot_path, columns)
+        elif os.path.exists(self.profiles_path):
+            with open(self.profiles_path) as f:
+                profiles = json.load(f)
+        keep = None if columns is None else {"username", *columns}
+        self.replayed = 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path) as f:
+                for line in f:
+                    try:
+                        result = json.loads(line)
+                    except ValueError:
+                        # torn final line from an interrupted append
+                        continue
+                    if keep is not None:
+                        result = {k: v for k, v in result.items() if k in keep}
+                    profiles[result["username"]] = result
+                    self.replayed += 1
+        return profiles
+
+    def append(self, result):
+        if self._fh is None:
+            self._fh = open(self.journal_path, "a+")
+            if self._fh.tell() > 0:
+                self._fh.seek(self._fh.tell() - 1)
+                if self._fh.read(1) != "\n":
+                    # start fresh after a torn line
+                    self._fh.write("\n")
+        self._fh.write(json.dumps(result) + "\n")
+        self._fh.flush()
+
+    def compact(self, profiles):
+        """Atomically write `profiles` to the snapshot and empty the journal."""
+        self.close()
+        write_snapshot(self.snapshot_path, profiles)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.replayed = 0
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
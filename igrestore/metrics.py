@@ -0,0 +1,163 @@
+"""Follower, following and post counts of each profile across fetches.
+
+A fetch overwrites a profile's counts in the snapshot, so fetch_all also
+appends them here. `profiles.metrics.db` has one row per account. Each
+series (fetch time, followers, following, posts) is an array of int32
+deltas from the previous point, stored as a BLOB, with times counted in
+seconds from EPOCH. The last point is kept in plain columns too, so an
+append doesn't decode anything.
+
+load_series() decodes every row once. growth() and rank_changes() then
+need one bisect per account, which keeps ranking 10k accounts over
+hundreds of fetch rounds to tens of milliseconds.
+"""
+
+import bisect
+import heapq
+import os
+import sqlite3
+from array import array
+from itertools import accumulate
+
+from igrestore.refresh import fetched_at
+
+# 2020-01-01 UTC. Times are seconds since then, which fits int32 until 2088.
+EPOCH = 1577836800
+METRICS = ("followers", "following", "posts")
+SERIES = ("t",) + METRICS
+TYPECODE = "i"
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS series (username TEXT PRIMARY KEY, points INTEGER NOT NULL, "
+    + ", ".join(f"last_{s} INTEGER NOT NULL" for s in SERIES) + ", "
+    + ", ".join(f"{s} BLOB NOT NULL" for s in SERIES) + ")"
+)
+
+
+def metrics_path_for(profiles_path):
+    root, _ = os.path.splitext(profiles_path)
+    return root + ".metrics.db"
+
+
+def _pack(values):
+    return array(TYPECODE, values).tobytes()
+
+
+class MetricsStore:
+    """Appends the counts of fetch results to the series at `path`."""
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+
+    def append(self, result):
+        """Add a point for an active result with counts. Returns whether one was added."""
+        values = [result.get(m) for m in METRICS]
+        if result.get("status") != "active" or not all(isinstance(v, int) for v in values):
+            return False
+        point = [int(fetched_at(result)) - EPOCH, *values]
+        if point[0] < 0:
+            return False
+        if self._conn is None:
+            # rollback journal rather than WAL, so every commit bumps the file's mtime
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute(SCHEMA)
+        with self._conn:
+            last = self._conn.execute(
+                f"SELECT {', '.join(f'last_{s}' for s in SERIES)}, {', '.join(SERIES)} "
+                "FROM series WHERE username = ?", (result["username"],)
+            ).fetchone()
+            if last is None:
+                self._conn.execute(
+                    f"INSERT INTO series VALUES (?, 1, {', '.join('?' * 2 * len(SERIES))})",
+                    (result["username"], *point, *(_pack([v]) for v in point)),
+                )
+                return True
+            # keep times non-decreasing for bisect, whatever the clock did
+            point[0] = max(point[0], last[0])
+            blobs = [blob + _pack([v - prev]) for blob, v, prev in zip(last[len(SERIES):], point, last)]
+            self._conn.execute(
+                f"UPDATE series SET points = points + 1, "
+                f"{', '.join(f'last_{s} = ?' for s in SERIES)}, {', '.join(f'{s} = ?' for s in SERIES)} "
+                "WHERE username = ?",
+                (*point, *blobs, result["username"]),
+            )
+        return True
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def load_series(path):
+    """{username: (times, followers, following, posts)} as lists of absolute values.
+
+    Times are seconds since EPOCH. Empty if there is no database yet.
+    """
+    if not os.path.exists(path):
+        return {}
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        series = {}
+        for username, *blobs in conn.execute(f"SELECT username, {', '.join(SERIES)} FROM series"):
+            columns = []
+            for blob in blobs:
+                deltas = array(TYPECODE)
+                deltas.frombytes(blob)
+                columns.append(list(accumulate(deltas)))
+            series[username] = tuple(columns)
+        return series
+    finally:
+        conn.close()
+
+
+def _base_index(times, since):
+    """The last point at or before `since`, or the first point if all are later."""
+    return max(bisect.bisect_right(times, since - EPOCH) - 1, 0)
+
+
+def growth(series, username, since=None):
+    """One account's points since `since` (epoch seconds; None for all) and the change over them.
+
+    None if the account has no points.
+    """
+    columns = series.get(username)
+    if columns is None:
+        return None
+    times = columns[0]
+    start = 0 if since is None else _base_index(times, since)
+    points = [
+        dict(t=EPOCH + times[i], **{m: columns[1 + k][i] for k, m in enumerate(METRICS)})
+        for i in range(start, len(times))
+    ]
+    change = {m: columns[1 + k][-1] - columns[1 + k][start] for k, m in enumerate(METRICS)}
+    return {"username": username, "points": points, "change": change}
+
+
+def rank_changes(series, metric="followers", since=None, limit=50, relative=False, descending=True):
+    """Accounts ranked by how much `metric` changed since `since` (epoch seconds; None for ever).
+
+    Each account's change is its latest value minus its value at the last
+    point at or before `since` (or its first point, if it was first fetched
+    later). Accounts with a single point in range are left out. `relative`
+    ranks by change / base value instead, skipping accounts with a base of 0.
+    """
+    k = 1 + METRICS.index(metric)
+    ranked = []
+    for username, columns in series.items():
+        times, values = columns[0], columns[k]
+        start = 0 if since is None else _base_index(times, since)
+        if start == len(times) - 1:
+            continue
+        base, latest = values[start], values[-1]
+        if relative and not base:
+            continue
+        change = latest - base
+        ranked.append((change / base if relative else change, username, base, latest, times[start], times[-1]))
+    pick = heapq.nlargest if descending else heapq.nsmallest
+    return [
+        {"username": username, "from": base, "to": latest, "change": latest - base,
+         "ratio": (latest - base) / base if base else None, "since": EPOCH + t0, "until": EPOCH + t1}
+        for _, username, base, latest, t0, t1 in pick(limit, ranked)
+    ]
@@ -0,0 +1,218 @@
+"""Parallel profile-picture downloader behind both fetch_pics.py scripts.
+
+Pictures are fetched by a bounded thread pool. Each body is hashed as it
+streams to `<username>.jpg` through fsutil.atomic_write(). A manifest next to the pics folder keeps each picture's ETag, Last-Modified
+and SHA-256. Later runs send conditional requests and leave the file alone
+on a 304 or when the new body hashes the same as the old one.
+
+Picture URLs are signed CDN links whose query string (oh=, oe=,
+_nc_ohc=) is re-issued all the time, but the media file name in the path
+stays the same until the avatar itself changes. The manifest records
+that name as the picture's asset ID. A URL with an unchanged asset ID is
+skipped without any request, even if the local file is gone. Pictures
+on disk with no manifest entry are recorded as they are, not refetched.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlsplit
+
+import requests
+
+from igrestore import thumbnails
+from igrestore.avatar_store import write_pack
+from igrestore.fsutil import Discard, atomic_write, write_json_atomic
+from igrestore.store import load_profiles, profile_sources
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
+                  "AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/125.0.0.0 Safari/537.36",
+}
+
+MIN_SIZE = 100
+CHUNK_SIZE = 64 * 1024
+
+
+def manifest_path_for(pics_dir):
+    return os.path.join(os.path.dirname(os.path.abspath(pics_dir)), "pics_manifest.json")
+
+
+def asset_id(url):
+    """The media file name in a picture URL's path, e.g. "568579937_..._n.jpg"; None if it has none."""
+    name = os.path.basename(urlsplit(url).path)
+    return name if "." in name else None
+
+
+def load_manifest(path):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def save_manifest(path, manifest):
+    write_json_atomic(path, manifest, indent=2, sort_keys=True)
+
+
+def seed_entry(dest, url):
+    """A manifest entry for a picture downloaded before there was a manifest."""
+    digest = hashlib.sha256()
+    with open(dest, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return {"url": url, "asset_id": asset_id(url), "sha256": digest.hexdigest(), "size": os.path.getsize(dest)}
+
+
+def download_pic(url, dest, entry, session):
+    """Fetch one picture. Returns (status, manifest_entry, detail).
+
+    status is "downloaded", "unchanged" or "failed"; on failure the previous
+    manifest entry (if any) is returned untouched.
+    """
+    headers = dict(HEADERS)
+    if entry and os.path.exists(dest):
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    try:
+        with session.get(url, headers=headers, timeout=15, stream=True) as resp:
+            if resp.status_code == 304:
+                return "unchanged", dict(entry or {}, url=url, asset_id=asset_id(url)), "not modified"
+            if resp.status_code != 200:
+                return "failed", entry, f"status {resp.status_code}"
+
+            digest = hashlib.sha256()
+            size = 0
+            result = None
+            with atomic_write(dest, ".part") as tmp:
+                with open(tmp, "wb") as f:
+                    for chunk in resp.iter_content(CHUNK_SIZE):
+                        f.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+                new_entry = {
+                    "url": url,
+                    "asset_id": asset_id(url),
+                    "etag": resp.headers.get("ETag"),
+                    "last_modified": resp.headers.get("Last-Modified"),
+                    "sha256": digest.hexdigest(),
+                    "size": size,
+                }
+                if size <= MIN_SIZE:
+                    result = "failed", entry, f"body too small ({size} bytes)"
+                elif entry and entry.get("sha256") == new_entry["sha256"] and os.path.exists(dest):
+                    result = "unchanged", new_entry, "same content"
+                if result:
+                    raise Discard
+            return result or ("downloaded", new_entry, f"{size} bytes")
+    except requests.RequestException as e:
+        return "failed", entry, str(e)
+
+
+def download_all(to_fetch, pics_dir, manifest_path=None, workers=8, force=False):
+    """Download [(username, url)] into pics_dir with `workers` threads.
+
+    URLs whose asset ID matches the manifest are skipped unless `force`.
+    Pictures already on disk without a manifest entry are recorded as they
+    are, under the current URL, instead of being requested again.
+    The manifest is saved when the run ends, including on Ctrl-C. Returns a
+    dict of counts per status.
+    """
+    manifest_path = manifest_path or manifest_path_for(pics_dir)
+    manifest = load_manifest(manifest_path)
+    os.makedirs(pics_dir, exist_ok=True)
+    sessions = threading.local()
+    counts = {"downloaded": 0, "unchanged": 0, "skipped": 0, "failed": 0}
+
+    if not force:
+        pending = []
+        for username, url in to_fetch:
+            entry = manifest.get(username)
+            dest = os.path.join(pics_dir, f"{username}.jpg")
+            if entry is None and os.path.isfile(dest) and os.path.getsize(dest) > MIN_SIZE:
+                manifest[username] = seed_entry(dest, url)
+                counts["skipped"] += 1
+                continue
+            asset = asset_id(url)
+            # entries from before asset IDs were recorded still have their URL
+            known = entry and (entry.get("asset_id") or asset_id(entry.get("url") or ""))
+            if asset and known == asset:
+                # same picture, freshly signed URL
+                entry.update(url=url, asset_id=asset)
+                counts["skipped"] += 1
+            else:
+                pending.append((username, url))
+        if counts["skipped"]:
+            print(f"Skipping {counts['skipped']} pictures already on disk or with an unchanged asset ID")
+        to_fetch = pending
+
+    def work(username, url):
+        if not hasattr(sessions, "session"):
+            sessions.session = requests.Session()
+        dest = os.path.join(pics_dir, f"{username}.jpg")
+        return download_pic(url, dest, manifest.get(username), sessions.session)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(work, username, url): username for username, url in to_fetch}
+        try:
+            for i, future in enumerate(as_completed(futures)):
+                username = futures[future]
+                status, entry, detail = future.result()
+                print(f"[{i + 1}/{len(to_fetch)}] {username}... {status} ({detail})")
+                counts[status] += 1
+                if entry:
+                    manifest[username] = entry
+        except KeyboardInterrupt:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            save_manifest(manifest_path, manifest)
+
+    return counts
+
+
+def main(profiles_path, pics_dir, build_thumbs=False):
+    """Command-line entry point shared by both fetch_pics.py scripts."""
+    parser = argparse.ArgumentParser(description="Download profile pictures")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent downloads (default: 8)")
+    parser.add_argument("--force", action="store_true",
+                        help="Request every picture, even those whose asset ID is unchanged")
+    parser.add_argument("--pack", action="store_true",
+                        help="Also pack pics/ into avatars.pack for the web app to serve from")
+    args = parser.parse_args()
+
+    if not any(os.path.exists(p) for p in profile_sources(profiles_path)):
+        print(f"ERROR: no profiles next to {profiles_path}. Run fetch_profiles.py first.")
+        return
+
+    # the snapshot plus anything a running fetch_profiles.py has journaled
+    profiles = load_profiles(profiles_path, ["profile_pic_url"])
+    to_fetch = [
+        (username, p["profile_pic_url"])
+        for username, p in profiles.items()
+        if p.get("profile_pic_url")
+    ]
+
+    print(f"Total profiles: {len(profiles)}, with picture URL: {len(to_fetch)}")
+
+    if not to_fetch:
+        print("All done!")
+        return
+
+    counts = download_all(to_fetch, pics_dir, workers=args.workers, force=args.force)
+    print(f"\nDone! {counts['downloaded']} downloaded, {counts['unchanged']} unchanged, "
+          f"{counts['skipped']} skipped, {counts['failed']} failed")
+
+    if args.pack:
+        print(f"Packed {write_pack(pics_dir)} pictures into avatars.pack")
+
+    if build_thumbs and thumbnails.available():
+        counts = thumbnails.build_all(pics_dir, workers=args.workers)
+        print(f"Thumbnails: {counts['built']} built, {counts['fresh']} up to date, {counts['failed']} failed")
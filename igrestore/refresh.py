@@ -0,0 +1,87 @@
+"""Decide which profiles a fetch run should (re)request.
+
+Every fetch result carries a `fetched_at` UTC timestamp. An account is due
+when it has never been fetched, or when its last result is older than the
+maximum age for its status. Errors are retried after a day, active profiles
+are refreshed monthly, and accounts that were not found are checked again
+quarterly. Due accounts go never-fetched first, then by priority (for
+example will_follow decisions before dont_follow), then by how far past
+their maximum age they are. The list is cut to the run's request budget.
+"""
+
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+DAY = 24 * 3600
+MAX_AGE = {"active": 30 * DAY, "not_found": 90 * DAY}
+# anything else (error, http_error, login_required, ...)
+DEFAULT_MAX_AGE = DAY
+TRANSIENT_STATUSES = ("error", "http_error", "login_required")
+
+DECISION_PRIORITY = {"will_follow": 3, "maybe_follow": 2, "undecided": 1}
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def fetched_at(profile):
+    """Epoch seconds of a profile's last fetch; 0 for results that predate fetched_at."""
+    try:
+        return datetime.fromisoformat(profile["fetched_at"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return 0.0
+
+
+def overdue(profile, now):
+    """Age as a multiple of the status's max age; >= 1 means due."""
+    max_age = MAX_AGE.get(profile.get("status"), DEFAULT_MAX_AGE)
+    return (now - fetched_at(profile)) / max_age
+
+
+def plan_fetches(usernames, profiles, priorities=None, budget=None, refresh=True, now=None):
+    """Usernames to request this run, most urgent first.
+
+    `priorities` maps username -> int (higher first, default 0). Without
+    `refresh`, only never-fetched accounts are due.
+    """
+    now = time.time() if now is None else now
+    priorities = priorities or {}
+    due = []
+    for username in usernames:
+        profile = profiles.get(username)
+        if profile is None:
+            due.append((0, 0, 0.0, username))
+        elif refresh:
+            ratio = overdue(profile, now)
+            if ratio >= 1:
+                due.append((1, -priorities.get(username, 0), -ratio, username))
+    due.sort()
+    if budget is not None:
+        due = due[:budget]
+    return [username for *_, username in due]
+
+
+def merge_result(old, new):
+    """Keep a good earlier result when a refresh only got a transient error."""
+    if old is None or new.get("status") not in TRANSIENT_STATUSES:
+        return new
+    if old.get("status") in TRANSIENT_STATUSES:
+        return new
+    return dict(old, last_error=new.get("status"), last_error_at=new.get("fetched_at"))
+
+
+def decision_priorities(db_path):
+    """{username: priority} from the web app's decisions table, if there is one."""
+    if not os.path.exists(db_path):
+        return {}
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT username, decision FROM decisions").fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    finally:
+        conn.close()
+    return {username: DECISION_PRIORITY.get(decision, 0) for username, decision in rows}
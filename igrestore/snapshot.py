@@ -0,0 +1,124 @@
+"""Compact SQLite snapshot of the fetched profiles.
+
+`profiles.db` holds one row per profile, one typed column per field (see
+COLUMNS). Any other keys a result carries, such as http_status or error,
+go into a JSON `extra` column. Readers name the columns they need, so the
+web apps don't decode biographies and URLs they never show. Reads go
+through a read-only connection with SQLite's mmap I/O turned on.
+
+profiles.json is still read when there is no snapshot yet. After that it
+is only an export: `python -m igrestore.snapshot export profiles.db`.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+
+from igrestore.fsutil import atomic_write, write_json_atomic
+
+COLUMNS = {
+    "username": "TEXT PRIMARY KEY",
+    "status": "TEXT",
+    "full_name": "TEXT",
+    "display_name": "TEXT",
+    "profile_url": "TEXT",
+    "profile_pic_url": "TEXT",
+    "followers": "INTEGER",
+    "following": "INTEGER",
+    "posts": "INTEGER",
+    "is_private": "INTEGER",
+    "is_verified": "INTEGER",
+    "biography": "TEXT",
+    "fetched_at": "TEXT",
+    "extra": "TEXT",
+}
+BOOL_COLUMNS = ("is_private", "is_verified")
+MMAP_SIZE = 256 * 1024 * 1024
+
+
+def snapshot_path_for(profiles_path):
+    root, _ = os.path.splitext(profiles_path)
+    return root + ".db"
+
+
+def _row(profile):
+    extra = {k: v for k, v in profile.items() if k not in COLUMNS}
+    values = [profile.get(c) for c in COLUMNS if c != "extra"]
+    return (*values, json.dumps(extra) if extra else None)
+
+
+def write_snapshot(path, profiles):
+    """Atomically replace the snapshot at `path` with `profiles` ({username: result})."""
+    with atomic_write(path, ".db") as tmp:
+        conn = sqlite3.connect(tmp)
+        try:
+            conn.execute("PRAGMA journal_mode=OFF")
+            conn.execute(f"CREATE TABLE profiles ({', '.join(f'{c} {t}' for c, t in COLUMNS.items())})")
+            conn.executemany(
+                f"INSERT INTO profiles VALUES ({', '.join('?' * len(COLUMNS))})",
+                (_row(p) for p in profiles.values()),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def read_snapshot(path, columns=None):
+    """{username: {column: value}} for every profile in the snapshot.
+
+    `columns` limits what is read (username is always included); None reads
+    everything, with `extra` merged back in. NULL fields are left out, as
+    the original results didn't have them.
+    """
+    if columns is None:
+        wanted = list(COLUMNS)
+    else:
+        wanted = ["username"] + [c for c in columns if c in COLUMNS and c != "username"]
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        cur = conn.execute(f"SELECT {', '.join(wanted)} FROM profiles")
+        bools = [c for c in wanted if c in BOOL_COLUMNS]
+        has_extra = "extra" in wanted
+        profiles = {}
+        for values in cur:
+            if None in values:
+                profile = {c: v for c, v in zip(wanted, values) if v is not None}
+            else:
+                profile = dict(zip(wanted, values))
+            for c in bools:
+                if c in profile:
+                    profile[c] = bool(profile[c])
+            if has_extra:
+                extra = profile.pop("extra", None)
+                if extra:
+                    profile.update(json.loads(extra))
+            profiles[values[0]] = profile
+        return profiles
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert between profiles.json and the profiles.db snapshot")
+    parser.add_argument("command", choices=("export", "import"),
+                        help="export: snapshot -> JSON; import: JSON -> snapshot")
+    parser.add_argument("snapshot", help="Path to profiles.db")
+    parser.add_argument("-j", "--json", help="JSON file (default: the snapshot's name with .json)")
+    args = parser.parse_args()
+
+    json_path = args.json or os.path.splitext(args.snapshot)[0] + ".json"
+    if args.command == "export":
+        profiles = read_snapshot(args.snapshot)
+        write_json_atomic(json_path, profiles, indent=2)
+        print(f"Exported {len(profiles)} profiles to {json_path}")
+    else:
+        with open(json_path) as f:
+            profiles = json.load(f)
+        write_snapshot(args.snapshot, profiles)
+        print(f"Imported {len(profiles)} profiles into {args.snapshot}")
+
+
+if __name__ == "__main__":
+    main()
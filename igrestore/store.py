@@ -0,0 +1,39 @@
+"""Read side of the profile data both web apps load.
+
+load_profiles() returns the last profile snapshot with any journaled fetch
+results applied, so an app started during a fetch run sees them too.
+pic_versions() says which users have a picture, using the avatar pack's
+index when there is one and a single listing of pics/ otherwise.
+"""
+
+import os
+
+from igrestore.journal import ProfileJournal, journal_path_for
+from igrestore.snapshot import snapshot_path_for
+
+
+def load_profiles(profiles_path, columns=None):
+    return ProfileJournal(profiles_path).load(columns)
+
+
+def profile_sources(profiles_path):
+    """Files whose mtimes decide when loaded profiles are stale."""
+    return (snapshot_path_for(profiles_path), profiles_path, journal_path_for(profiles_path))
+
+
+def pic_versions(pics_dir, avatars=None):
+    """{username: version} for every available picture.
+
+    The version (pack SHA-1 prefix or file mtime) changes whenever the
+    picture does, so it can bust caches in image URLs.
+    """
+    packed = avatars.entries() if avatars is not None else {}
+    if packed:
+        return {username: entry[2][:12] for username, entry in packed.items()}
+    versions = {}
+    if os.path.isdir(pics_dir):
+        with os.scandir(pics_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".jpg"):
+                    versions[entry.name[:-4]] = int(entry.stat().st_mtime)
+    return versions
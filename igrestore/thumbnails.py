@@ -0,0 +1,123 @@
+"""Small WebP/JPEG variants of the downloaded profile pictures.
+
+Thumbnails are written to `thumbs/<size>/<username>.<format>` next to the
+pics folder. A thumbnail is rebuilt only when it is missing or older than
+its source picture. That makes running this after fetch_pics.py cheap, and
+app.py can call ensure_thumb() per request and get a cached file back.
+Needs Pillow; without it, available() is False and app.py serves the
+original pictures.
+
+Usage:
+    python -m igrestore.thumbnails                # thumbnails for ./pics
+    python -m igrestore.thumbnails unfollowers/pics --workers 4
+"""
+
+import argparse
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from igrestore.fsutil import atomic_write
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# square edge lengths in px; cards show pictures at 56 CSS px
+SIZES = (64, 128)
+FORMATS = {"webp": ("WEBP", 80), "jpg": ("JPEG", 85)}
+
+
+def available():
+    return Image is not None
+
+
+def thumbs_dir_for(pics_dir):
+    return os.path.join(os.path.dirname(os.path.abspath(pics_dir)), "thumbs")
+
+
+def thumb_path(thumbs_dir, username, size, fmt):
+    return os.path.join(thumbs_dir, str(size), f"{username}.{fmt}")
+
+
+def make_thumb(src, dest, size, fmt):
+    """Write a size x size center crop of `src` (a path or file object) to `dest`, atomically."""
+    pil_format, quality = FORMATS[fmt]
+    with Image.open(src) as im:
+        thumb = ImageOps.fit(im.convert("RGB"), (size, size), Image.LANCZOS)
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    with atomic_write(dest, f".{fmt}") as tmp, open(tmp, "wb") as f:
+        thumb.save(f, format=pil_format, quality=quality)
+    return dest
+
+
+def ensure_thumb(pics_dir, thumbs_dir, username, size, fmt, store=None):
+    """Path to an up-to-date thumbnail, building it first if needed.
+
+    The source is read from `store` (an AvatarStore) when it holds the
+    username, else from pics_dir. Returns None if there is no source picture
+    or it can't be decoded.
+    """
+    packed = store.get(username) if store is not None else None
+    if packed is not None:
+        view, _, src_mtime = packed
+        src = io.BytesIO(view)
+    else:
+        src = os.path.join(pics_dir, f"{username}.jpg")
+        try:
+            src_mtime = os.stat(src).st_mtime_ns
+        except FileNotFoundError:
+            return None
+    dest = thumb_path(thumbs_dir, username, size, fmt)
+    try:
+        if os.stat(dest).st_mtime_ns >= src_mtime:
+            return dest
+    except FileNotFoundError:
+        pass
+    try:
+        return make_thumb(src, dest, size, fmt)
+    except OSError:
+        return None
+
+
+def build_all(pics_dir, thumbs_dir=None, workers=4):
+    """Bring every thumbnail of every picture in pics_dir up to date.
+
+    Returns a dict of counts for "built", "fresh" and "failed".
+    """
+    thumbs_dir = thumbs_dir or thumbs_dir_for(pics_dir)
+    usernames = [f[:-4] for f in os.listdir(pics_dir) if f.endswith(".jpg")] if os.path.isdir(pics_dir) else []
+    jobs = [(u, size, fmt) for u in usernames for size in SIZES for fmt in FORMATS]
+    counts = {"built": 0, "fresh": 0, "failed": 0}
+
+    def work(job):
+        username, size, fmt = job
+        dest = thumb_path(thumbs_dir, username, size, fmt)
+        before = os.stat(dest).st_mtime_ns if os.path.exists(dest) else None
+        path = ensure_thumb(pics_dir, thumbs_dir, username, size, fmt)
+        if path is None:
+            return "failed"
+        return "fresh" if os.stat(path).st_mtime_ns == before else "built"
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for status in pool.map(work, jobs):
+            counts[status] += 1
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build WebP/JPEG thumbnails for pics/")
+    parser.add_argument("pics_dir", nargs="?", default="pics", help="Pictures folder (default: ./pics)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent encoders (default: 4)")
+    args = parser.parse_args()
+
+    if not available():
+        print("Pillow is not installed (pip install Pillow); nothing to do")
+        return
+    counts = build_all(args.pics_dir, workers=args.workers)
+    print(f"Thumbnails: {counts['built']} built, {counts['fresh']} up to date, {counts['failed']} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,111 @@
+#!/usr/bin/env python3
+"""Extract the following list from a saved Instagram "Following" page into following.csv.
+
+The default parser makes one streaming pass over the HTML with
+html.parser, collecting each `_a6hd` profile anchor, the display-name span
+that follows it and the `<username>'s profile picture` image as it goes.
+The older BeautifulSoup and regex extractors are kept for `--benchmark`,
+which times all three on the same input.
+"""
+
+import argparse
 import csv
+import os
 import re
+import time
 from html import unescape
+from html.parser import HTMLParser
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+INPUT_HTML = os.path.join(DATA_DIR, "data.xml")
+OUTPUT_CSV = os.path.join(DATA_DIR, "following.csv")
+
+CHUNK_SIZE = 64 * 1024
+
+HREF_RE = re.compile(r'^/([^/]+)/$')
+DISPLAY_CLASS_RE = re.compile(r'x1lliihq.*x193iq5w.*x6ikm8r.*x10wlt62.*xlyipyv.*xuxw1ft')
+PIC_ALT_RE = re.compile(r"^(.+?)'s profile picture", re.IGNORECASE)
+
+
+class FollowingParser(HTMLParser):
+    """Single-pass extractor; feed it HTML in any size chunks, then call accounts()."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._accounts = {}
+        self._awaiting_name = []
+        self._pics = {}
+        self._name_depth = 0
+        self._name_parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "span":
+            if self._name_depth:
+                self._name_depth += 1
+                return
+            if self._awaiting_name and DISPLAY_CLASS_RE.search(dict(attrs).get("class") or ""):
+                self._name_depth = 1
+                self._name_parts = []
+        elif tag == "a":
+            attrs = dict(attrs)
+            if "_a6hd" not in (attrs.get("class") or "").split():
+                return
+            m = HREF_RE.match(attrs.get("href") or "")
+            if not m or m.group(1) in self._accounts:
+                return
+            username = m.group(1)
+            self._accounts[username] = {"username": username, "display_name": None}
+            self._awaiting_name.append(username)
+        elif tag == "img":
+            attrs = dict(attrs)
+            m = PIC_ALT_RE.match(attrs.get("alt") or "")
+            if m and attrs.get("src"):
+                self._pics.setdefault(m.group(1).lower(), attrs["src"])
+
+    def handle_endtag(self, tag):
+        if tag != "span" or not self._name_depth:
+            return
+        self._name_depth -= 1
+        if self._name_depth == 0:
+            # html.parser splits text wherever a fed chunk ends, so strip only the whole name
+            name = "".join(self._name_parts).strip()
+            for username in self._awaiting_name:
+                self._accounts[username]["display_name"] = name
+            self._awaiting_name = []
 
-with open('/Users/conradchan/repos/personal/igrestore/data.xml', 'r', encoding='utf-8') as f:
-    html = f.read()
+    def handle_data(self, data):
+        if self._name_depth:
+            self._name_parts.append(data)
 
-try:
+    def accounts(self):
+        return [
+            (
+                username,
+                username if a["display_name"] is None else a["display_name"],
+                f"https://instagram.com/{username}",
+                self._pics.get(username.lower(), ""),
+            )
+            for username, a in self._accounts.items()
+        ]
+
+
+def parse_streaming(path, chunk_size=CHUNK_SIZE):
+    parser = FollowingParser()
+    with open(path, "r", encoding="utf-8") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            parser.feed(chunk)
+    parser.close()
+    return parser.accounts()
+
+
+def parse_bs4(html):
+    """Original BeautifulSoup extractor (one whole-document img search per anchor)."""
     from bs4 import BeautifulSoup
     soup = BeautifulSoup(html, 'html.parser')
-    
+
     accounts = []
     # Find all anchor tags with _a6hd class
     for a_tag in soup.find_all('a', class_=re.compile(r'_a6hd')):
@@ -17,20 +114,22 @@ try:
         if not username_match:
             continue
         username = username_match.group(1)
-        
+
         # Display name: span with those specific classes
         display_span = a_tag.find_next('span', class_=re.compile(r'x1lliihq.*x193iq5w.*x6ikm8r.*x10wlt62.*xlyipyv.*xuxw1ft'))
         display_name = display_span.get_text(strip=True) if display_span else username
-        
+
         # Profile pic: img with alt containing username's profile picture
         img = soup.find('img', alt=re.compile(re.escape(username) + r".*profile picture", re.IGNORECASE))
         pic_url = unescape(img['src']) if img and img.get('src') else ''
-        
+
         profile_url = f'https://instagram.com/{username}'
         accounts.append((username, display_name, profile_url, pic_url))
-    
-except ImportError:
-    # Fallback to regex
+    return accounts
+
+
+def parse_regex(html):
+    """Original regex extractor (whole-document searches per username)."""
     pattern = re.compile(
         r'<a[^>]*class="[^"]*_a6hd[^"]*"[^>]*href="/([^/]+)/"[^>]*>',
         re.DOTALL
@@ -40,7 +139,7 @@ except ImportError:
         r'<a[^>]*href="/([^/]+)/"[^>]*class="[^"]*_a6hd[^"]*"[^>]*>',
         re.DOTALL
     )
-    
+
     usernames = pattern.findall(html) + pattern2.findall(html)
     # dedupe preserving order
     seen = set()
@@ -49,7 +148,7 @@ except ImportError:
         if u not in seen:
             seen.add(u)
             unique.append(u)
-    
+
     accounts = []
     for username in unique:
         # display name
@@ -65,7 +164,7 @@ except ImportError:
             m = dn_pat.search(chunk)
             if m:
                 display_name = unescape(re.sub(r'<[^>]+>', '', m.group(1)).strip())
-        
+
         # profile pic
         pic_pat = re.compile(
             r'<img[^>]*alt="' + re.escape(username) + r'[^"]*profile picture[^"]*"[^>]*src="([^"]+)"',
@@ -77,18 +176,80 @@ except ImportError:
         )
         pic_m = pic_pat.search(html) or pic_pat2.search(html)
         pic_url = unescape(pic_m.group(1)) if pic_m else ''
-        
+
         profile_url = f'https://instagram.com/{username}'
         accounts.append((username, display_name, profile_url, pic_url))
+    return accounts
+
+
+def write_csv(accounts, path):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(['username', 'display_name', 'profile_url', 'profile_pic_url'])
+        writer.writerows(accounts)
+
+
+def benchmark(path):
+    """Time the streaming parser against the BeautifulSoup and regex paths."""
+    with open(path, 'r', encoding='utf-8') as f:
+        html = f.read()
+    print(f"Input: {path} ({len(html) / 1e6:.1f} MB)\n")
+
+    runs = [("streaming", lambda: parse_streaming(path)), ("regex", lambda: parse_regex(html))]
+    try:
+        import bs4  # noqa: F401
+        runs.insert(1, ("beautifulsoup", lambda: parse_bs4(html)))
+    except ImportError:
+        print("beautifulsoup4 not installed, skipping that path\n")
+
+    results = {}
+    for name, fn in runs:
+        start = time.perf_counter()
+        accounts = fn()
+        elapsed = time.perf_counter() - start
+        results[name] = accounts
+        print(f"  {name:<14} {elapsed:8.3f}s  {len(accounts)} rows")
+
+    whole = FollowingParser()
+    whole.feed(html)
+    whole.close()
+    # any chunk boundary must give the same rows as one feed of the whole file
+    same_chunked = parse_streaming(path, chunk_size=97) == results["streaming"] == whole.accounts()
+    print(f"\n  streaming in 97-char chunks matches a whole-file parse: {same_chunked}")
+
+    streaming = {a[0]: a for a in results["streaming"]}
+    print()
+    for name, accounts in results.items():
+        if name == "streaming":
+            continue
+        unique = {a[0]: a for a in reversed(accounts)}
+        same_users = set(unique) == set(streaming)
+        same_pics = all(streaming[u][3] == unique[u][3] for u in unique if u in streaming)
+        same_names = sum(streaming[u][1] == unique[u][1] for u in unique if u in streaming)
+        print(f"  vs {name}: same usernames={same_users}, same pic URLs={same_pics}, "
+              f"same display names={same_names}/{len(unique)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse a saved Instagram following page into following.csv")
+    parser.add_argument("input", nargs="?", default=INPUT_HTML, help="Saved HTML page (default: data.xml)")
+    parser.add_argument("-o", "--output", default=OUTPUT_CSV, help="CSV to write (default: following.csv)")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Time the streaming parser against the BeautifulSoup and regex paths instead of writing the CSV")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.input)
+        return
+
+    accounts = parse_streaming(args.input)
+    write_csv(accounts, args.output)
+
+    print(f"Total accounts: {len(accounts)}\n")
+    print("First 5 rows:")
+    for row in accounts[:5]:
+        print(f"  {row[0]} | {row[1]} | {row[2]} | {row[3][:80]}...")
+
 
-# Write CSV
-outpath = '/Users/conradchan/repos/personal/igrestore/following.csv'
-with open(outpath, 'w', newline='', encoding='utf-8') as f:
-    writer = csv.writer(f, quoting=csv.QUOTE_ALL)
-    writer.writerow(['username', 'display_name', 'profile_url', 'profile_pic_url'])
-    writer.writerows(accounts)
-
-print(f"Total accounts: {len(accounts)}\n")
-print("First 5 rows:")
-for row in accounts[:5]:
-    print(f"  {row[0]} | {row[1]} | {row[2]} | {row[3][:80]}...")
+if __name__ == "__main__":
+    main()
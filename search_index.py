@@ -0,0 +1,145 @@
+"""Full-text search over the merged profile rows used by app.py.
+
+Rows are mirrored into an in-memory SQLite FTS5 table with the trigram
+tokenizer, which answers case-insensitive substring queries from an index and
+ranks hits with bm25, scoring at most RANK_CAP hits per query. Queries
+shorter than three characters can't use trigrams: they are answered from a
+posting table of one- and two-character grams, filled per gram on first use,
+and ranked search falls back to username prefix lookups on a sorted list. If
+the local SQLite build lacks FTS5 or the trigram tokenizer, every query falls
+back to a scan of the lowercased rows.
+"""
+
+import bisect
+import heapq
+import sqlite3
+from collections import OrderedDict
+
+FIELDS = ("username", "display_name", "notes", "biography")
+# bm25 column weights, in FIELDS order
+WEIGHTS = (10.0, 5.0, 2.0, 1.0)
+# hits scored per ranked query, and prefix hits considered per search
+RANK_CAP = 2000
+# short grams whose postings are kept
+POSTINGS_SIZE = 256
+
+
+def _phrase(text):
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _field_values(row):
+    return tuple(row.get(f) or "" for f in FIELDS)
+
+
+def _text(row):
+    # NUL between fields so no match spans two of them
+    return "\0".join(_field_values(row)).lower()
+
+
+class SearchIndex:
+    def __init__(self, rows):
+        self._texts = [_text(r) for r in rows]
+        self._postings = OrderedDict()
+        self._usernames = sorted((r["username"].lower(), i) for i, r in enumerate(rows))
+        try:
+            db = sqlite3.connect(":memory:", check_same_thread=False)
+            db.execute(
+                "CREATE VIRTUAL TABLE profile_fts USING fts5"
+                f"({', '.join(FIELDS)}, tokenize='trigram')"
+            )
+            db.executemany(
+                f"INSERT INTO profile_fts (rowid, {', '.join(FIELDS)}) VALUES (?, ?, ?, ?, ?)",
+                ((i, *_field_values(r)) for i, r in enumerate(rows)),
+            )
+            self._db = db
+        except sqlite3.OperationalError:
+            self._db = None
+
+    def update(self, pos, row):
+        """Re-index one row after its notes (or any other field) changed."""
+        text = self._texts[pos] = _text(row)
+        for gram, positions in self._postings.items():
+            if gram in text:
+                positions.add(pos)
+            else:
+                positions.discard(pos)
+        if self._db is None:
+            return
+        self._db.execute(
+            f"UPDATE profile_fts SET {', '.join(f + ' = ?' for f in FIELDS)} WHERE rowid = ?",
+            (*_field_values(row), pos),
+        )
+
+    def _scan(self, query):
+        return {i for i, text in enumerate(self._texts) if query in text}
+
+    def _short(self, gram):
+        positions = self._postings.get(gram)
+        if positions is None:
+            positions = self._postings[gram] = self._scan(gram)
+            while len(self._postings) > POSTINGS_SIZE:
+                self._postings.popitem(last=False)
+        else:
+            self._postings.move_to_end(gram)
+        return set(positions)
+
+    def matches(self, query):
+        """Positions of every row containing `query` in any indexed field."""
+        query = query.lower()
+        if len(query) < 3:
+            return self._short(query)
+        if self._db is None:
+            return self._scan(query)
+        cur = self._db.execute("SELECT rowid FROM profile_fts WHERE profile_fts MATCH ?", (_phrase(query),))
+        return {r[0] for r in cur}
+
+    def _prefix(self, query, limit):
+        start = bisect.bisect_left(self._usernames, (query, -1))
+        end = min(bisect.bisect_left(self._usernames, (query + "\U0010ffff",), start), start + RANK_CAP)
+        hits = heapq.nsmallest(
+            limit, ((len(name) != len(query), len(name), name, pos) for name, pos in self._usernames[start:end])
+        )
+        return [pos for *_, pos in hits]
+
+    def _ranked(self, match_expr, limit):
+        # bm25 only for the first RANK_CAP hits, so broad queries stay cheap
+        cur = self._db.execute(
+            f"SELECT rowid FROM (SELECT rowid, bm25(profile_fts, {', '.join(map(str, WEIGHTS))}) AS score "
+            "FROM profile_fts WHERE profile_fts MATCH ? LIMIT ?) ORDER BY score LIMIT ?",
+            (match_expr, RANK_CAP, limit),
+        )
+        return [r[0] for r in cur]
+
+    def search(self, query, limit=20):
+        """Ranked lookup returning [(position, match_kind)].
+
+        Username prefix hits (exact match first) rank above substring hits in
+        any field, which rank above fuzzy hits that only share some trigrams
+        with the query.
+        """
+        query = query.strip().lower()
+        if not query:
+            return []
+        results = [(pos, "prefix") for pos in self._prefix(query, limit)]
+        seen = {pos for pos, _ in results}
+
+        def extend(positions, kind):
+            for pos in positions:
+                if len(results) >= limit:
+                    return
+                if pos not in seen:
+                    seen.add(pos)
+                    results.append((pos, kind))
+
+        if self._db is None:
+            extend(sorted(self._scan(query)), "substring")
+            return results
+        if len(query) >= 3:
+            # names first, so hits there aren't crowded out of the capped ranking
+            extend(self._ranked("{username display_name} : " + _phrase(query), limit + len(seen)), "substring")
+            extend(self._ranked(_phrase(query), limit + len(seen)), "substring")
+        if len(results) < limit and len(query) >= 4:
+            grams = {query[i:i + 3] for i in range(len(query) - 2)}
+            extend(self._ranked(" OR ".join(_phrase(g) for g in sorted(grams)), limit + len(seen)), "fuzzy")
+        return results
@@ -3,42 +3,182 @@
 
 import json
 import os
-from flask import Flask, render_template, send_from_directory
+import sys
+import threading
+from datetime import datetime
+from flask import Flask, Response, jsonify, render_template, request, send_from_directory
 
-app = Flask(__name__)
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))
+
+from igrestore.avatar_store import AvatarStore, pack_path_for  # noqa: E402
+from igrestore.fsutil import mtimes_ns  # noqa: E402
+from igrestore.store import load_profiles, pic_versions, profile_sources  # noqa: E402
+
+app = Flask(__name__)
+RESULTS_JSON = os.path.join(SCRIPT_DIR, "results.json")
+PROFILES_JSON = os.path.join(SCRIPT_DIR, "profiles.json")
 PICS_DIR = os.path.join(SCRIPT_DIR, "pics")
+avatars = AvatarStore(pack_path_for(PICS_DIR))
+# the profile fields templates/index.html shows
+PROFILE_COLUMNS = ("status", "full_name", "biography", "followers", "following", "posts", "is_private", "is_verified")
 
+# tab name in the UI -> list in results.json
+TABS = {
+    "not_following_back": "not_following_back",
+    "pending": "pending_not_following_back",
+    "mutuals": "mutuals",
+    "fans": "fans",
+}
+DATE_FIELDS = ("followed_at", "requested_at", "followed_you_at")
+EXPORT_DATE_FORMAT = "%b %d, %Y %I:%M %p"
+DEFAULT_PAGE_SIZE = 60
+MAX_PAGE_SIZE = 500
 
-@app.route("/")
-def index():
-    results_path = os.path.join(SCRIPT_DIR, "results.json")
-    profiles_path = os.path.join(SCRIPT_DIR, "profiles.json")
 
-    if not os.path.exists(results_path):
-        return "No results.json found. Run find_unfollowers.py first.", 404
+# Rows for every tab are built once from results.json, the profile snapshot
+# and the picture listing, with each sort order precomputed, and rebuilt only
+# when one of those files changes.
+_cache_lock = threading.Lock()
+_cache = {"mtimes": None, "results": None, "tabs": {}}
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, EXPORT_DATE_FORMAT)
+    except (TypeError, ValueError):
+        return datetime.min
+
+
+def _build_tab(entries, profiles, versions):
+    rows = []
+    for item in entries:
+        username = item["username"]
+        profile = profiles.get(username, {})
+        row = {c: profile[c] for c in PROFILE_COLUMNS if c in profile}
+        row["username"] = username
+        row["date"] = next((item[f] for f in DATE_FIELDS if item.get(f)), "")
+        row["has_pic"] = username in versions
+        row["pic_version"] = versions.get(username)
+        rows.append(row)
 
-    with open(results_path) as f:
-        results = json.load(f)
+    positions = range(len(rows))
+    dates = [_parse_date(r["date"]) for r in rows]
+    followers = [r.get("followers") or 0 for r in rows]
+    by_name = sorted(positions, key=lambda i: rows[i]["username"].casefold())
+    return {
+        "rows": rows,
+        "haystacks": [
+            " ".join((r["username"], r.get("full_name") or "", r.get("biography") or "")).lower()
+            for r in rows
+        ],
+        "orders": {
+            "alpha": by_name,
+            "alpha-desc": by_name[::-1],
+            # reverse=True keeps ties in results.json order, like a stable JS sort
+            "date-new": sorted(positions, key=dates.__getitem__, reverse=True),
+            "date-old": sorted(positions, key=dates.__getitem__),
+            "followers-high": sorted(positions, key=followers.__getitem__, reverse=True),
+            "followers-low": sorted(positions, key=followers.__getitem__),
+        },
+    }
 
-    profiles = {}
-    if os.path.exists(profiles_path):
-        with open(profiles_path) as f:
-            profiles = json.load(f)
 
-    # Check which pics exist locally
-    pic_set = set()
-    if os.path.isdir(PICS_DIR):
-        for fname in os.listdir(PICS_DIR):
-            if fname.endswith(".jpg"):
-                pic_set.add(fname[:-4])
+def load_data():
+    """Return results.json, rebuilding the per-tab rows if any source changed. None if missing."""
+    mtimes = mtimes_ns(RESULTS_JSON, *profile_sources(PROFILES_JSON), PICS_DIR, avatars.path)
+    with _cache_lock:
+        if mtimes != _cache["mtimes"]:
+            if mtimes[0] is None:
+                _cache.update(mtimes=mtimes, results=None, tabs={})
+                return None
+            with open(RESULTS_JSON) as f:
+                results = json.load(f)
+            profiles = load_profiles(PROFILES_JSON, PROFILE_COLUMNS)
+            versions = pic_versions(PICS_DIR, avatars)
+            tabs = {tab: _build_tab(results.get(key, []), profiles, versions) for tab, key in TABS.items()}
+            _cache.update(mtimes=mtimes, results=results, tabs=tabs)
+        return _cache["results"]
+
+
+def query_tab(tab, q="", privacy="all", sort="alpha", cursor=0, limit=DEFAULT_PAGE_SIZE):
+    """One page of a tab, filtered and sorted server-side. Returns (items, total, next_cursor).
+
+    `cursor` is a position in the chosen sort order, as in the restore app.
+    """
+    load_data()
+    with _cache_lock:
+        data = _cache["tabs"].get(tab)
+        if data is None:
+            return [], 0, None
+        rows = data["rows"]
+        order = data["orders"].get(sort) or data["orders"]["alpha"]
+        q = q.lower()
+        wanted_private = {"public": False, "private": True}.get(privacy)
+
+        if not q and wanted_private is None:
+            total = len(order)
+            page = order[cursor:cursor + limit]
+            end = cursor + len(page)
+        else:
+            haystacks = data["haystacks"]
+            matches = {
+                i for i, r in enumerate(rows)
+                if (not q or q in haystacks[i])
+                and (wanted_private is None or r.get("is_private") is wanted_private)
+            }
+            total = len(matches)
+            page = []
+            end = cursor
+            while end < len(order) and len(page) < limit:
+                if order[end] in matches:
+                    page.append(order[end])
+                end += 1
+
+        next_cursor = end if end < len(order) and page else None
+        return [rows[i] for i in page], total, next_cursor
+
+
+@app.route("/")
+def index():
+    results = load_data()
+    if results is None:
+        return "No results.json found. Run find_unfollowers.py first.", 404
+    return render_template("index.html", results=results)
+
 
-    return render_template("index.html", results=results, profiles=profiles, pic_set=list(pic_set))
+@app.route("/api/<tab>")
+def api_tab(tab):
+    if tab not in TABS:
+        return jsonify({"error": f"unknown tab {tab!r}"}), 404
+    if load_data() is None:
+        return jsonify({"error": "no results.json; run find_unfollowers.py first"}), 404
+    args = request.args
+    try:
+        cursor = max(int(args.get("cursor") or 0), 0)
+        limit = min(max(int(args.get("limit") or DEFAULT_PAGE_SIZE), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "cursor and limit must be integers"}), 400
+    items, total, next_cursor = query_tab(
+        tab,
+        q=args.get("q", "").strip(),
+        privacy=args.get("privacy", "all"),
+        sort=args.get("sort", "alpha"),
+        cursor=cursor,
+        limit=limit,
+    )
+    return jsonify({"items": items, "total": total, "next_cursor": next_cursor})
 
 
 @app.route("/pics/<filename>")
 def serve_pic(filename):
-    return send_from_directory(PICS_DIR, filename)
+    packed = avatars.get(filename[:-4]) if filename.endswith(".jpg") else None
+    if packed is None:
+        return send_from_directory(PICS_DIR, filename)
+    view, sha1, _ = packed
+    resp = Response(bytes(view), mimetype="image/jpeg")
+    resp.set_etag(sha1)
+    return resp.make_conditional(request)
 
 
 if __name__ == "__main__":
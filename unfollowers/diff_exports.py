@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+"""Show who followed, unfollowed or stopped following back between two runs of find_unfollowers.py."""
+
+import os
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))
+
+from igrestore.history import main  # noqa: E402
+
+HISTORY_DB = os.path.join(SCRIPT_DIR, "history.db")
+
+
+if __name__ == "__main__":
+    main(HISTORY_DB)
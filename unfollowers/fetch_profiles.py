@@ -9,87 +9,41 @@ Usage:
       2. Open DevTools (F12) > Application > Cookies > instagram.com
       3. Copy the value of 'sessionid'
 
-    Pass --reset to re-fetch accounts that previously returned errors.
+    Pass --reset to re-fetch accounts that previously returned errors, or
+    --refresh (optionally with --budget N) to also re-fetch stale profiles.
 """
 
 import argparse
 import json
 import os
-import random
 import sys
-import time
-
-import requests
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))
+
+from igrestore.fetcher import API_URL, fetch_all, status_counts  # noqa: E402
+from igrestore.journal import ProfileJournal  # noqa: E402
+from igrestore.metrics import MetricsStore, metrics_path_for  # noqa: E402
+from igrestore.refresh import plan_fetches  # noqa: E402
+
 RESULTS_JSON = os.path.join(SCRIPT_DIR, "results.json")
 PROFILES_JSON = os.path.join(SCRIPT_DIR, "profiles.json")
 
-API_URL = "https://www.instagram.com/api/v1/users/web_profile_info/"
-
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
-                  "AppleWebKit/537.36 (KHTML, like Gecko) "
-                  "Chrome/125.0.0.0 Safari/537.36",
-    "Accept": "*/*",
-    "Accept-Language": "en-US,en;q=0.9",
-    "X-IG-App-ID": "936619743392459",
-    "X-Requested-With": "XMLHttpRequest",
-}
-
-
-def load_existing():
-    if os.path.exists(PROFILES_JSON):
-        with open(PROFILES_JSON) as f:
-            return json.load(f)
-    return {}
-
-
-def save_progress(data):
-    with open(PROFILES_JSON, "w") as f:
-        json.dump(data, f, indent=2)
-
-
-def fetch_profile(username, session):
-    try:
-        resp = session.get(API_URL, params={"username": username}, headers=HEADERS, timeout=15)
-    except requests.RequestException as e:
-        return {"username": username, "status": "error", "error": str(e)}
-
-    if resp.status_code == 404:
-        return {"username": username, "status": "not_found"}
-    if resp.status_code in (401, 403):
-        return {"username": username, "status": "login_required", "http_status": resp.status_code}
-    if resp.status_code != 200:
-        return {"username": username, "status": "http_error", "http_status": resp.status_code}
-
-    try:
-        data = resp.json()
-    except (ValueError, json.JSONDecodeError):
-        return {"username": username, "status": "error", "error": "invalid json"}
-
-    user = data.get("data", {}).get("user")
-    if user is None:
-        return {"username": username, "status": "not_found"}
-
-    return {
-        "username": username,
-        "status": "active",
-        "full_name": user.get("full_name", ""),
-        "profile_pic_url": user.get("profile_pic_url_hd") or user.get("profile_pic_url", ""),
-        "followers": user.get("edge_followed_by", {}).get("count"),
-        "following": user.get("edge_follow", {}).get("count"),
-        "posts": user.get("edge_owner_to_timeline_media", {}).get("count"),
-        "is_private": user.get("is_private", False),
-        "is_verified": user.get("is_verified", False),
-        "biography": user.get("biography", ""),
-    }
+# Refresh order: the accounts you'd act on first
+CATEGORY_PRIORITY = {"not_following_back": 2, "pending_not_following_back": 2, "mutuals": 1, "fans": 0}
 
 
 def main():
     parser = argparse.ArgumentParser(description="Fetch Instagram profile data")
     parser.add_argument("--sessionid", required=True, help="Your Instagram sessionid cookie")
     parser.add_argument("--reset", action="store_true", help="Re-fetch accounts that previously returned errors")
+    parser.add_argument("--refresh", action="store_true",
+                        help="Also re-fetch profiles whose data is stale for their status")
+    parser.add_argument("--budget", type=int, help="Max profiles to request this run (default: no limit)")
+    parser.add_argument("--workers", type=int, default=1, help="Concurrent fetch workers (default: 1)")
+    parser.add_argument("--rate", type=float, default=0.3,
+                        help="Max requests per second across all workers (default: 0.3)")
+    parser.add_argument("--api-url", default=API_URL, help="Profile API endpoint (point at a local stub for testing)")
     args = parser.parse_args()
 
     if not os.path.exists(RESULTS_JSON):
@@ -100,19 +54,18 @@ def main():
         results = json.load(f)
 
     # Collect all unique usernames across all categories
-    all_usernames = set()
-    for entry in results.get("not_following_back", []):
-        all_usernames.add(entry["username"])
-    for entry in results.get("pending_not_following_back", []):
-        all_usernames.add(entry["username"])
-    for entry in results.get("mutuals", []):
-        all_usernames.add(entry["username"])
-    for entry in results.get("fans", []):
-        all_usernames.add(entry["username"])
+    priorities = {}
+    for category, priority in CATEGORY_PRIORITY.items():
+        for entry in results.get(category, []):
+            priorities[entry["username"]] = max(priority, priorities.get(entry["username"], 0))
+    all_usernames = set(priorities)
 
     print(f"Total unique accounts: {len(all_usernames)}")
 
-    profiles = load_existing()
+    journal = ProfileJournal(PROFILES_JSON)
+    profiles = journal.load()
+    if journal.replayed:
+        print(f"Replayed {journal.replayed} results from {journal.journal_path}")
 
     if args.reset:
         # Remove entries that had errors so they get re-fetched
@@ -122,55 +75,27 @@ def main():
             del profiles[u]
         if removed:
             print(f"Reset {len(removed)} errored entries for re-fetch")
-            save_progress(profiles)
+            journal.compact(profiles)
 
     already_ok = {u for u, p in profiles.items() if p.get("status") in ("active", "not_found")}
-    remaining = sorted(all_usernames - already_ok)
-    print(f"Already fetched: {len(already_ok)}, remaining: {len(remaining)}")
+    # errored results are always retried; --refresh also picks up stale ones
+    pending = {u: p for u, p in profiles.items() if u in already_ok}
+    remaining = plan_fetches(sorted(all_usernames), pending, priorities=priorities, budget=args.budget,
+                             refresh=args.refresh)
+    print(f"Already fetched: {len(already_ok)}, this run: {len(remaining)}")
 
     if not remaining:
+        if journal.replayed:
+            journal.compact(profiles)
         print("All done!")
         return
 
-    session = requests.Session()
-    session.cookies.set("sessionid", args.sessionid, domain=".instagram.com")
-    consecutive_errors = 0
-
-    for i, username in enumerate(remaining):
-        print(f"[{len(already_ok) + i + 1}/{len(all_usernames)}] {username}...", end=" ", flush=True)
-
-        result = fetch_profile(username, session)
-        profiles[username] = result
-
-        status = result.get("status", "unknown")
-        extra = ""
-        if status == "active":
-            extra = f" ({result.get('followers', '?')} followers)"
-        print(f"{status}{extra}")
-
-        if status in ("error", "http_error", "login_required"):
-            consecutive_errors += 1
-            if consecutive_errors >= 5:
-                print(f"\n{consecutive_errors} consecutive errors. Pausing 60s...")
-                save_progress(profiles)
-                time.sleep(60)
-                consecutive_errors = 0
-        else:
-            consecutive_errors = 0
-
-        if (i + 1) % 10 == 0:
-            save_progress(profiles)
-
-        time.sleep(random.uniform(2, 5))
-
-    save_progress(profiles)
-    print(f"\nDone! Saved {len(profiles)} profiles to {PROFILES_JSON}")
-
-    statuses = {}
-    for v in profiles.values():
-        s = v.get("status", "unknown")
-        statuses[s] = statuses.get(s, 0) + 1
-    print("Status summary:", statuses)
+    fetch_all(remaining, profiles, journal, workers=args.workers, rate=args.rate, api_url=args.api_url,
+              cookies={"sessionid": args.sessionid}, metrics=MetricsStore(metrics_path_for(PROFILES_JSON)))
+
+    journal.compact(profiles)
+    print(f"\nDone! Saved {len(profiles)} profiles to {journal.snapshot_path}")
+    print("Status summary:", status_counts(profiles))
 
 
 if __name__ == "__main__":
@@ -3,157 +3,92 @@
 Find Instagram accounts you follow (or requested to follow) that don't follow you back.
 
 Usage:
-    Place your Instagram data export folder in this directory, then run:
+    Place your Instagram data export (the .zip or the unzipped folder) in
+    this directory, then run:
       python find_unfollowers.py
+      python find_unfollowers.py --workers 4   # processes used to parse the export files
+      python find_unfollowers.py ~/Downloads/instagram-me-2026-02-08.zip
 
-    The script auto-detects the export folder and parses:
+    The script auto-detects the export and parses (straight from the zip,
+    without extracting it):
       - connections/followers_and_following/followers_1.html (+ followers_2.html, etc.)
       - connections/followers_and_following/following.html
       - connections/followers_and_following/pending_follow_requests.html
+    or the .json files of the same names in a JSON-format export.
 
     To get your data export from Instagram:
       Settings > Accounts Center > Your Information and Permissions >
       Download Your Information > Download or transfer information >
-      select your account > Download to device > select HTML format
+      select your account > Download to device > select HTML or JSON format
 """
 
+import argparse
 import json
-import glob
 import os
-import re
 import sys
+import time
 from datetime import datetime
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(SCRIPT_DIR))
 
+from igrestore.exports import find_export, load_export  # noqa: E402
+from igrestore.history import diff_snapshots, load_snapshot, print_diff, record_snapshot  # noqa: E402
 
-def find_export_dir(base_dir):
-    """Auto-detect the Instagram export folder."""
-    for entry in os.listdir(base_dir):
-        path = os.path.join(base_dir, entry)
-        if os.path.isdir(path) and "instagram" in entry.lower():
-            connections = os.path.join(path, "connections", "followers_and_following")
-            if os.path.isdir(connections):
-                return connections
-    # Maybe they put files directly in the folder
-    if os.path.exists(os.path.join(base_dir, "connections", "followers_and_following")):
-        return os.path.join(base_dir, "connections", "followers_and_following")
-    return None
-
-
-def parse_html_entries(html_content):
-    """Extract usernames and dates from Instagram export HTML.
-
-    The HTML has entries like:
-      <a target="_blank" href="https://www.instagram.com/username">username</a>
-      <div>Feb 08, 2026 1:17 pm</div>
-
-    Or for following.html:
-      <h2 class="...">username</h2>
-      <a target="_blank" href="https://www.instagram.com/_u/username">...</a>
-      <div>Feb 08, 2026 1:17 pm</div>
-
-    Returns dict of {username: {"date": "Feb 08, 2026 1:17 pm"}}
-    """
-    results = {}
-
-    # Extract username from instagram.com links
-    # Handles both /username and /_u/username formats
-    link_pattern = re.compile(
-        r'href="https://www\.instagram\.com/(?:_u/)?([^"/?]+)"'
-    )
-    # Date pattern: "Mon DD, YYYY H:MM am/pm" appearing in <div> after the link
-    date_pattern = re.compile(
-        r'</a></div><div>([A-Z][a-z]{2} \d{1,2}, \d{4} \d{1,2}:\d{2} [ap]m)</div>'
-    )
-
-    # Find all links with their positions
-    links = list(link_pattern.finditer(html_content))
-    dates = list(date_pattern.finditer(html_content))
-
-    # Build a list of dates by position for matching
-    date_by_pos = {}
-    for m in dates:
-        date_by_pos[m.start()] = m.group(1)
-
-    for link_match in links:
-        username = link_match.group(1).strip()
-        if not username:
-            continue
-
-        # Find the closest date after this link
-        link_end = link_match.end()
-        best_date = ""
-        for date_match in dates:
-            if date_match.start() > link_end and date_match.start() - link_end < 200:
-                best_date = date_match.group(1)
-                break
-
-        if username not in results:
-            results[username] = {"date": best_date}
-
-    return results
-
-
-def load_followers(directory):
-    """Load all followers_*.html files."""
-    pattern = os.path.join(directory, "followers_*.html")
-    files = sorted(glob.glob(pattern))
-    if not files:
-        print("ERROR: No followers_*.html files found in", directory)
-        sys.exit(1)
-
-    all_followers = {}
-    for f in files:
-        print(f"  Loading {os.path.basename(f)}...")
-        with open(f, encoding="utf-8") as fh:
-            all_followers.update(parse_html_entries(fh.read()))
-    return all_followers
+HISTORY_DB = os.path.join(SCRIPT_DIR, "history.db")
 
 
-def load_following(directory):
-    """Load following.html."""
-    path = os.path.join(directory, "following.html")
-    if not os.path.exists(path):
-        print("ERROR: following.html not found in", directory)
-        sys.exit(1)
+class PhaseTimer:
+    """Collects wall-clock time per named phase for the summary at the end."""
 
-    print("  Loading following.html...")
-    with open(path, encoding="utf-8") as f:
-        return parse_html_entries(f.read())
+    def __init__(self):
+        self.phases = []
+        self._start = time.perf_counter()
 
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self._start))
+        self._start = now
 
-def load_pending_requests(directory):
-    """Load pending_follow_requests.html (optional)."""
-    path = os.path.join(directory, "pending_follow_requests.html")
-    if not os.path.exists(path):
-        return {}
-
-    print("  Loading pending_follow_requests.html...")
-    with open(path, encoding="utf-8") as f:
-        return parse_html_entries(f.read())
+    def report(self):
+        print("Timing:")
+        for name, elapsed in self.phases:
+            print(f"  {name:<22} {elapsed:8.3f}s")
+        print(f"  {'total':<22} {sum(e for _, e in self.phases):8.3f}s")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Find accounts that don't follow you back")
+    parser.add_argument("export", nargs="?",
+                        help="Export .zip or folder (default: auto-detect in this directory)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Processes used to parse export files (default: CPU count)")
+    args = parser.parse_args()
+    timer = PhaseTimer()
+
     print("=" * 60)
     print("Instagram Unfollower Finder")
     print("=" * 60)
     print()
 
-    export_dir = find_export_dir(SCRIPT_DIR)
-    if not export_dir:
-        print("ERROR: Could not find Instagram export folder.")
-        print(f"  Place your unzipped Instagram export in: {SCRIPT_DIR}")
-        print("  Expected structure: <export_folder>/connections/followers_and_following/")
+    source = args.export or find_export(SCRIPT_DIR)
+    if not source:
+        print("ERROR: Could not find Instagram export.")
+        print(f"  Place your Instagram export .zip or unzipped folder in: {SCRIPT_DIR}")
+        print("  Expected structure: <export>/connections/followers_and_following/")
         sys.exit(1)
 
-    print(f"Found export at: {export_dir}")
+    print(f"Found export at: {source}")
+    timer.mark("locate export")
     print()
-    print("Loading data...")
+    print(f"Loading data ({args.workers} workers)...")
 
-    followers = load_followers(export_dir)
-    following = load_following(export_dir)
-    pending = load_pending_requests(export_dir)
+    try:
+        followers, following, pending = load_export(source, args.workers)
+    except FileNotFoundError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    timer.mark("parse export")
 
     print()
     print(f"  Followers:         {len(followers)}")
@@ -190,6 +125,8 @@ def main():
         if username in followers
     }
 
+    timer.mark("compare")
+
     # --- Print results ---
 
     print("=" * 60)
@@ -255,6 +192,17 @@ def main():
     with open(output_path, "w") as f:
         json.dump(output, f, indent=2)
     print(f"Detailed results saved to: {output_path}")
+    timer.mark("write results")
+
+    snapshot_id, previous_id = record_snapshot(HISTORY_DB, followers, following, pending, source)
+    print(f"Snapshot #{snapshot_id} saved to: {HISTORY_DB}")
+    if previous_id is not None:
+        print()
+        print(f"Changes since snapshot #{previous_id} (python diff_exports.py for the full lists):")
+        print_diff(diff_snapshots(load_snapshot(HISTORY_DB, previous_id), load_snapshot(HISTORY_DB, snapshot_id)), 10)
+    timer.mark("snapshot history")
+    print()
+    timer.report()
 
 
 if __name__ == "__main__":